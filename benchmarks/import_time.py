@@ -0,0 +1,83 @@
+"""
+Cold start budget: time to `import main` and build the app, in a fresh interpreter.
+
+    python benchmarks/import_time.py                  # best of 3 runs, exit 1 over --budget-ms
+    python benchmarks/import_time.py --budget-ms 800 --top 15
+
+No env vars, DB or SMTP needed: the app is built from Settings(database_url="sqlite://"),
+which connects nothing until startup. The slowest imports (python -X importtime) are
+listed so you can see what to make lazy when the budget breaks.
+
+FastAPI + SQLAlchemy + Pydantic alone take most of the time (~0.8 s of ~1.1 s on a
+slow shared CPU, far less on a normal one). The default budget leaves room for that,
+and still catches one big eager import sneaking back in (fastapi-mail ~0.5 s,
+aiosmtplib or NumPy ~0.1 s each).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from settings import Settings
+main.create_app(Settings(database_url="sqlite://"))
+built = time.perf_counter()
+print(f"{{(imported - started) * 1000:.1f}} {{(built - imported) * 1000:.1f}}")
+"""
+
+
+def _run_once(profile: bool = False):
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    flags = ["-X", "importtime"] if profile else []  # Adds its own overhead, so only for the listing
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", CHILD.format(root=ROOT)],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(ROOT), check=True,
+    )
+    import_ms, build_ms = map(float, result.stdout.split()[-2:])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports only (nested ones are counted inside their parent)
+        if name.startswith("  "):
+            continue
+        modules.append((int(cumulative) / 1000, name.strip()))
+    return import_ms, build_ms, sorted(modules, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Max import + create_app time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    # Best run: the others mostly measure a cold disk cache
+    runs = [_run_once() for _ in range(args.runs)]
+    import_ms, build_ms, _ = min(runs, key=lambda run: run[0] + run[1])
+    modules = _run_once(profile=True)[2]
+    total = import_ms + build_ms
+
+    print(f"import main   {import_ms:8.1f} ms")
+    print(f"create_app()  {build_ms:8.1f} ms")
+    print(f"total         {total:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    print("\nslowest imports:")
+    for cumulative_ms, name in modules[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    if total > args.budget_ms:
+        print(f"\nOver budget by {total - args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
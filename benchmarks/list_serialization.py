@@ -0,0 +1,104 @@
+"""
+Pydantic path vs fast path (column tuples + orjson) for the list endpoints.
+
+    python benchmarks/list_serialization.py                 # temp SQLite DB
+    python benchmarks/list_serialization.py --limit 200 --repeat 100
+
+Seeds one seller with products and orders, then times one page of GET /products/ and
+GET /orders/ work (query + build + JSON) both ways and checks the bytes are identical.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _seed(db, products: int, orders: int):
+    from sqlalchemy import insert
+    from models import User, Product, Order, OrderItem
+
+    seller = User(business_name="Bench", location="Lagos", email="bench@example.com",
+                  password_hash="x", is_verified=True)
+    db.add(seller)
+    db.flush()
+
+    db.execute(insert(Product), [
+        {"name": f"Product {i}", "description": f"Bench product number {i}", "price": 1000.0 + i,
+         "quantity_in_stock": i % 50, "category": f"Category {i % 8}", "subcategory": f"Sub {i % 20}",
+         "sku": f"SKU-{i}", "seller_id": seller.id}
+        for i in range(products)
+    ])
+    start = datetime(2025, 1, 1)
+    order_ids = db.scalars(insert(Order).returning(Order.id, sort_by_parameter_order=True), [
+        {"seller_id": seller.id, "total_amount": 2500.0, "status": "completed",
+         "created_at": start + timedelta(minutes=i)}
+        for i in range(orders)
+    ]).all()
+    db.execute(insert(OrderItem), [
+        {"order_id": order_id, "product_id": 1 + (order_id * 7 + n) % products, "quantity": 1 + n,
+         "price_at_purchase": 500.0 + n}
+        for order_id in order_ids
+        for n in range(3)
+    ])
+    db.commit()
+    return seller.id
+
+
+def _time(fn, repeat: int) -> float:
+    fn()  # Warm-up (statement cache, imports)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DB_ASYNC"] = "false"
+
+    from database import SessionLocal, sync_schema
+    from core import fastjson
+    from routes.products import _list_products, _product_list
+    from routes.orders import _get_my_orders, _order_list
+
+    sync_schema()
+    db = SessionLocal()
+    seller_id = _seed(db, args.products, args.orders)
+
+    cases = {
+        "products": (
+            lambda: _product_list.dump_json(_list_products(db, seller_id, args.limit, None)[0]),
+            lambda: fastjson.dumps(_list_products(db, seller_id, args.limit, None, fast=True)[0]),
+        ),
+        "orders": (
+            lambda: _order_list.dump_json(_get_my_orders(db, seller_id, args.limit, None)[0]),
+            lambda: fastjson.dumps(_get_my_orders(db, seller_id, args.limit, None, fast=True)[0]),
+        ),
+    }
+
+    print(f"page size {args.limit}, {args.repeat} runs each, json: {'orjson' if fastjson.orjson else 'pydantic'}")
+    print(f"{'endpoint':<10} {'pydantic ms':>12} {'fast ms':>10} {'speed-up':>9}  same bytes")
+    for name, (slow, fast) in cases.items():
+        same = slow() == fast()
+        db.expire_all()
+        slow_ms = _time(lambda: (slow(), db.expire_all()), args.repeat)
+        fast_ms = _time(fast, args.repeat)
+        print(f"{name:<10} {slow_ms:>12.2f} {fast_ms:>10.2f} {slow_ms / fast_ms:>8.1f}x  {same}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Load test for the seller API hot paths, run against the app in-process.
+
+    python benchmarks/load.py                               # temp SQLite, default scale
+    python benchmarks/load.py --sellers 20 --years 3 --clients 32 --requests 1000
+    python benchmarks/load.py --database-url postgresql://localhost/mkmart_bench
+    python benchmarks/load.py --save-baseline               # write benchmarks/baseline.json
+    python benchmarks/load.py --fail-on-regression          # compare with it, exit 1 if slower
+
+Seeds synthetic sellers (catalogue + years of daily orders + rollups), then for each
+endpoint fires --requests requests from --clients concurrent clients through httpx's
+ASGI transport (no network, same event loop) and reports p50/p95/p99 latency,
+throughput, errors and SQL statements per request.
+
+Needs httpx (pip install httpx). The Postgres database must exist and be empty.
+Rate limits are off and the response cache is off by default here, so the numbers
+are the real query path; set RESPONSE_CACHE_SIZE to measure with the cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+PASSWORD = "bench-password"
+
+
+# --- seeding -----------------------------------------------------------------
+
+def seed(db, sellers: int, products: int, years: int, orders_per_day: int, seed_value: int):
+    """Sellers with catalogues and order history. Returns [(seller_id, email, [product ids])]"""
+    from sqlalchemy import insert
+    from models import User, Product, Order, OrderItem
+    from core.security import hash_password
+    from core.rollups import rebuild_all
+
+    rng = random.Random(seed_value)
+    password_hash = hash_password(PASSWORD)  # Same password for everybody — hash once
+    days = 365 * years
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    categories = ["Phones", "Laptops", "Audio", "Accessories", "TVs", "Gaming", "Cameras", "Wearables"]
+
+    seeded = []
+    for s in range(sellers):
+        email = f"seller{s}@bench.local"
+        user = User(business_name=f"Bench Store {s}", location="Lagos", email=email,
+                    password_hash=password_hash, is_verified=True)
+        db.add(user)
+        db.flush()
+
+        product_ids = db.scalars(insert(Product).returning(Product.id, sort_by_parameter_order=True), [
+            {
+                "name": f"{categories[i % len(categories)]} item {i}",
+                "description": f"Synthetic product {i} for seller {s}",
+                "price": round(rng.uniform(2000, 900000), 2),
+                "quantity_in_stock": 1000000,  # Sales during the run must never run out
+                "category": categories[i % len(categories)],
+                "subcategory": f"Line {i % 12}",
+                "sku": f"S{s}-P{i}",
+                "seller_id": user.id,
+            }
+            for i in range(products)
+        ]).all()
+
+        orders, baskets = [], []
+        for day in range(days):
+            created = today - timedelta(days=days - day)
+            for n in range(rng.randint(max(0, orders_per_day // 2), orders_per_day * 3 // 2)):
+                basket = [
+                    (rng.choice(product_ids), rng.randint(1, 4), round(rng.uniform(2000, 900000), 2))
+                    for _ in range(rng.randint(1, 3))
+                ]
+                baskets.append(basket)
+                orders.append({
+                    "seller_id": user.id,
+                    "total_amount": round(sum(quantity * price for _, quantity, price in basket), 2),
+                    "status": "completed",
+                    "created_at": created + timedelta(seconds=rng.randint(0, 86399)),
+                })
+        order_ids = db.scalars(insert(Order).returning(Order.id, sort_by_parameter_order=True), orders).all()
+        db.execute(insert(OrderItem), [
+            {"order_id": order_id, "product_id": product_id, "quantity": quantity, "price_at_purchase": price}
+            for order_id, basket in zip(order_ids, baskets)
+            for product_id, quantity, price in basket
+        ])
+        db.commit()
+        seeded.append((user.id, email, product_ids))
+
+    rebuild_all(db, [seller_id for seller_id, _, _ in seeded])
+    return seeded
+
+
+# --- query counting ----------------------------------------------------------
+
+class QueryCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+# --- load --------------------------------------------------------------------
+
+def percentile(sorted_values, q: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(q) - 1]
+
+
+async def run_endpoint(client, make_request, total: int, clients: int) -> dict:
+    latencies, errors, statuses = [], 0, {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = make_request()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_rps": round(total / elapsed, 1),
+    }
+
+
+async def run(args, seeded):
+    import httpx
+    import main
+    import database
+    from datetime import timedelta as td
+    from core.security import create_access_token, user_token_claims
+    from models import User
+
+    db_engines = database.get_database()
+    engines = [db_engines.engine] + ([db_engines.async_engine.sync_engine] if db_engines.async_engine is not None else [])
+    counter = QueryCounter(engines)
+    rng = random.Random(args.seed)
+
+    db = database.SessionLocal()
+    tokens = {
+        seller_id: create_access_token(user_token_claims(db.get(User, seller_id)), td(hours=2))
+        for seller_id, _, _ in seeded
+    }
+    db.close()
+
+    def auth(seller_id):
+        return {"Authorization": f"Bearer {tokens[seller_id]}"}
+
+    def pick():
+        return rng.choice(seeded)
+
+    def login():
+        _, email, _ = pick()
+        return "POST", "/users/login", {"json": {"email": email, "password": PASSWORD}}
+
+    def list_products():
+        seller_id, _, _ = pick()
+        return "GET", "/products/?limit=50", {"headers": auth(seller_id)}
+
+    def restock_alerts():
+        seller_id, _, _ = pick()
+        return "GET", "/inventory/alerts/", {"headers": auth(seller_id)}
+
+    def record_sale():
+        seller_id, _, product_ids = pick()
+        items = [
+            {"product_id": product_id, "quantity": 1, "price_at_purchase": 1000.0}
+            for product_id in rng.sample(product_ids, min(2, len(product_ids)))
+        ]
+        return "POST", "/orders/", {"headers": auth(seller_id), "json": {"items": items}}
+
+    def list_orders():
+        seller_id, _, _ = pick()
+        return "GET", "/orders/?limit=50", {"headers": auth(seller_id)}
+
+    endpoints = {
+        "login": login,
+        "list_products": list_products,
+        "list_orders": list_orders,
+        "restock_alerts": restock_alerts,
+        "record_sale": record_sale,
+    }
+    if args.only:
+        endpoints = {name: endpoints[name] for name in args.only}
+
+    await main.app.router.startup()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in endpoints.items():
+                # Warm-up, then the same request again alone to count its SQL statements
+                method, url, kwargs = make_request()
+                await client.request(method, url, **kwargs)
+                before = counter.count
+                await client.request(method, url, **kwargs)
+                queries = counter.count - before
+
+                result = await run_endpoint(client, make_request, args.requests, args.clients)
+                result["queries_per_request"] = queries
+                results[name] = result
+                print_row(name, result)
+    finally:
+        await main.app.router.shutdown()
+    return results
+
+
+# --- reporting ---------------------------------------------------------------
+
+def print_header():
+    print(f"{'endpoint':<16}{'reqs':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+
+
+def print_row(name, r):
+    print(f"{name:<16}{r['requests']:>7}{r['errors']:>8}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+          f"{r['p99_ms']:>9.2f}{r['throughput_rps']:>9.1f}{r['queries_per_request']:>9}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions vs the baseline: p95 or throughput worse than tolerance, or more queries"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries {before['queries_per_request']} -> {current['queries_per_request']} per request"
+            )
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to seed (default: temp SQLite file)")
+    parser.add_argument("--sellers", type=int, default=5)
+    parser.add_argument("--products", type=int, default=500, help="Products per seller")
+    parser.add_argument("--years", type=int, default=2, help="Years of order history")
+    parser.add_argument("--orders-per-day", type=int, default=10, help="Average orders per seller per day")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint")
+    parser.add_argument("--only", nargs="+", choices=["login", "list_products", "list_orders", "restock_alerts", "record_sale"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before it counts (0.2 = 20%%)")
+    parser.add_argument("--output", help="Also write this run's JSON here")
+    args = parser.parse_args()
+
+    # Must be set before the settings are first loaded (first DB use)
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+
+    from database import SessionLocal, sync_schema
+
+    sync_schema()
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        seeded = seed(db, args.sellers, args.products, args.years, args.orders_per_day, args.seed)
+    finally:
+        db.close()
+    print(f"Seeded {args.sellers} sellers x {args.products} products, {args.years}y of orders "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    print_header()
+    results = asyncio.run(run(args, seeded))
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items()
+                   if key in ("sellers", "products", "years", "orders_per_day", "clients", "requests")},
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("\nBaseline was recorded with a different scale — comparison may be meaningless")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions vs baseline:")
+            for line in regressions:
+                print("  - " + line)
+            status = 1 if args.fail_on_regression else 0
+        else:
+            print(f"\nNo regressions vs baseline ({args.tolerance:.0%} tolerance)")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main_cli()
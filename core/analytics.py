@@ -0,0 +1,115 @@
+from sqlalchemy.orm import Session
+
+from models import User, Product, ProductSales, CategorySales, DailySales
+from core.rollups import rebuild_rollups
+
+
+def _ensure_rollups(db: Session, seller_id: int):
+    """
+    Backfill the seller's rollups once from their orders. Guessing from DailySales no work:
+    one sale after deploy creates a row while the older history is still missing.
+    """
+    if not db.query(User.rollups_built).filter(User.id == seller_id).scalar():
+        rebuild_rollups(db, seller_id)  # Also sets users.rollups_built
+        db.commit()
+
+
+def _has_rollups(db: Session, seller_id: int) -> bool:
+    # Every recorded order lands in a daily bucket, so one row here = seller has sales
+    return db.query(DailySales.day).filter(DailySales.seller_id == seller_id).first() is not None
+
+
+def sales_summary(db: Session, seller_id: int, top_n: int = 3):
+    """
+    Total revenue, revenue per category and the top N products of the best category,
+    read from the sales rollups (cost no depend on how many orders the seller get).
+    Returns None if the seller never recorded an order.
+    """
+    _ensure_rollups(db, seller_id)
+    if not _has_rollups(db, seller_id):
+        return None
+
+    category_sales = {
+        row.category: row.revenue
+        for row in db.query(CategorySales.category, CategorySales.revenue)
+        .filter(CategorySales.seller_id == seller_id)
+    }
+    total_revenue = sum(category_sales.values())
+
+    top_category = max(category_sales, key=category_sales.get) if category_sales else None
+    top_products = (
+        db.query(
+            Product.id,
+            Product.name,
+            Product.category,
+            Product.quantity_in_stock,
+            Product.reorder_point,
+            ProductSales.revenue,
+        )
+        .join(ProductSales, ProductSales.product_id == Product.id)
+        .filter(ProductSales.seller_id == seller_id, Product.category == top_category)
+        .order_by(ProductSales.revenue.desc(), Product.id)
+        .limit(top_n)
+        .all()
+    ) if top_category is not None else []
+
+    return {
+        "total_revenue": total_revenue,
+        "category_sales": category_sales,
+        "top_category": top_category,
+        "top_products": top_products,
+    }
+
+
+def restock_alerts(db: Session, seller_id: int) -> dict:
+    """The full /inventory/alerts/ payload for one seller"""
+    summary = sales_summary(db, seller_id, top_n=3)  # Limit to top 3 products
+
+    if summary is None:
+        return {"message": "No sales yet — start recording sales to get smart restock alerts!"}
+
+    total_revenue = summary["total_revenue"]
+    category_sales = summary["category_sales"]
+
+    if total_revenue == 0:
+        return {"message": "No revenue recorded yet — keep selling!"}
+
+    # Top category + its top-selling products already come ranked from the query
+    top_category = summary["top_category"]
+    category_percentage = (category_sales[top_category] / total_revenue) * 100
+
+    top_products = [
+        {
+            "name": row.name,
+            "revenue": round(row.revenue, 2),
+            "stock_left": row.quantity_in_stock,
+            "low_stock": row.quantity_in_stock <= row.reorder_point
+        }
+        for row in summary["top_products"]
+    ]
+
+    # Build message
+    message = f"{top_category} dey hot pass! 🔥 E carry {category_percentage:.1f}% of your total sales ({round(total_revenue, 2):,} NGN).\n\n"
+    
+    if top_products:
+        message += "Top sellers for restock:\n"
+        for p in top_products:
+            message += f"- {p['name']}: {p['revenue']:,} NGN sold\n"
+            if p['low_stock']:
+                message += "   ⚠️ STOCK DEY LOW O! Buy more sharp sharp!\n"
+            else:
+                message += "   Stock still okay.\n"
+    
+    # Extra low stock alert if any hot product dey low
+    low_stock_products = [p['name'] for p in top_products if p['low_stock']]
+    if low_stock_products:
+        message += "\nURGENT: " + ", ".join(low_stock_products) + " dey finish fast — restock NOW before customers vex! ⏰"
+    
+    return {
+        "top_category": top_category,
+        "category_percentage": round(category_percentage, 1),
+        "total_revenue": round(total_revenue, 2),
+        "top_products": top_products,  # For frontend later
+        "message": message,
+        "category_breakdown": dict(category_sales)
+    }
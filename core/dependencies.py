@@ -1,28 +1,123 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
+import os
 
-from database import get_db
+from database import DBRunner, ReadDBRunner, get_database, get_db, get_db_runner
 from models import User
-from core.security import SECRET_KEY, ALGORITHM
+from core.security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, EMBED_USER_CLAIMS
+from core.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+# Authenticated users seen recently, so most requests skip the users query.
+# TTL bounds how long another worker fit keep a stale entry after revocation.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
+
+def reset_principal_cache():
+    """Forget cached users (new app on another database = other users with the same ids)"""
+    principal_cache.clear()
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only snapshot of the logged-in user — enough for routes wey only need the id"""
+    id: int
+    is_verified: bool
+    token_version: int
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
+        payload["sub"] = int(user_id)
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+def _check_version(payload: dict, token_version: int):
+    # Tokens from before token versions existed count as version 0
+    if payload.get("ver", 0) != token_version:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
 
-    user = db.query(User).filter(User.id == user_id).first()
+# Cached in place of a Principal for deleted accounts, so their tokens stop working at once
+_DELETED = object()
+
+# With embedded claims the cache na the only thing wey fit reject an old token,
+# so keep revocations for as long as such a token fit still be valid
+_REVOCATION_TTL = ACCESS_TOKEN_EXPIRE_MINUTES * 60 if EMBED_USER_CLAIMS else None
+
+def cache_user(user: User):
+    """Refresh the cached snapshot — call after changing a user (profile, password, verification)"""
+    principal = Principal(user.id, bool(user.is_verified), user.token_version)
+    principal_cache.set(user.id, principal, ttl=_REVOCATION_TTL)
+    return principal
+
+def forget_user(user_id: int):
+    """Reject every token of a deleted user"""
+    principal_cache.set(user_id, _DELETED, ttl=_REVOCATION_TTL)
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Full User row from the DB — use this when the route changes the user"""
+    payload = _decode_token(token)
+
+    user = db.query(User).filter(User.id == payload["sub"]).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    _check_version(payload, user.token_version)
+    cache_user(user)
     return user
+
+def _load_user(db: Session, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: DBRunner = Depends(get_db_runner)
+) -> Principal:
+    """Cached user snapshot — no DB round trip while the cache is warm"""
+    payload = _decode_token(token)
+    user_id = payload["sub"]
+
+    principal = principal_cache.get(user_id)
+    if principal is _DELETED:
+        raise HTTPException(status_code=401, detail="User not found")
+    if principal is not None and payload.get("ver", 0) <= principal.token_version:
+        _check_version(payload, principal.token_version)
+        return principal
+
+    if EMBED_USER_CLAIMS and "verified" in payload:
+        # Everything we need dey inside the signed token
+        principal = Principal(user_id, bool(payload["verified"]), payload.get("ver", 0))
+        principal_cache.set(user_id, principal)
+        return principal
+
+    # Cache miss (or newer token than the cached version): load from DB.
+    # The session only checks out a connection here, so warm hits never touch the pool.
+    user = await db.run(_load_user, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    _check_version(payload, user.token_version)
+    return cache_user(user)
+
+async def get_read_db_runner(current_user: Principal = Depends(get_current_principal)):
+    """
+    Like get_db_runner, for read-only routes: runs on a read replica when
+    DATABASE_REPLICA_URLS is set, else (or right after this seller wrote) on the primary.
+    """
+    runner = ReadDBRunner(get_database().replicas.choose(current_user.id))
+    try:
+        yield runner
+    finally:
+        await runner.close()
@@ -1,28 +1,24 @@
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from pydantic import BaseModel, EmailStr
 from typing import List
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from settings import get_settings
 
-# Debug: print environment variables to confirm loading
-print("Loaded MAIL_USERNAME:", os.getenv("MAIL_USERNAME"))
-print("Loaded MAIL_PASSWORD:", os.getenv("MAIL_PASSWORD"))
-print("Loaded MAIL_SERVER:", os.getenv("MAIL_SERVER"))
-print("Loaded MAIL_FROM:", os.getenv("MAIL_FROM"))
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT", "587")),
-    MAIL_SERVER=os.getenv("MAIL_SERVER"),
-    MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "True").lower() in ("true", "1", "yes"),
-    MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "False").lower() in ("true", "1", "yes"),
-    USE_CREDENTIALS=os.getenv("USE_CREDENTIALS", "True").lower() in ("true", "1", "yes"),
-    VALIDATE_CERTS=os.getenv("VALIDATE_CERTS", "True").lower() in ("true", "1", "yes")
-)
+def get_conf() -> ConnectionConfig:
+    """fastapi-mail config from the settings, built when needed (the app itself sends through core/mailer.py)"""
+    settings = get_settings()
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_STARTTLS=settings.mail_starttls,
+        MAIL_SSL_TLS=settings.mail_ssl_tls,
+        USE_CREDENTIALS=settings.use_credentials,
+        VALIDATE_CERTS=settings.validate_certs,
+        TIMEOUT=settings.mail_timeout,
+    )
 
 class EmailSchema(BaseModel):
-    email: List[EmailStr]
\ No newline at end of file
+    email: List[EmailStr]
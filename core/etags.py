@@ -0,0 +1,94 @@
+"""
+Conditional GET for the seller's list endpoints.
+
+users.data_version goes up (same transaction) whenever something wey the lists show
+changes: product create/edit/import, sales, profile updates. A list response's ETag
+is built from (seller, version, endpoint, query), so:
+- If-None-Match with the current ETag -> 304 after one primary-key lookup;
+- with RESPONSE_CACHE_SIZE > 0, the serialized JSON for that ETag is kept in memory
+  and re-sent without running the row queries or Pydantic again.
+Old versions are never invalidated explicitly — their keys just stop being asked for.
+"""
+import hashlib
+import os
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from database import get_database
+from models import User
+from core.cache import TTLCache
+from core.pagination import NEXT_CURSOR_HEADER
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # 0 = off
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS) if RESPONSE_CACHE_SIZE else None
+
+
+def reset_response_cache():
+    """Drop cached bodies — ETags are only unique per database"""
+    if response_cache is not None:
+        response_cache.clear()
+
+# Clients must revalidate every time, but fit keep the body to replay on a 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_version(db: Session, seller_id: int):
+    """Mark the seller's lists as changed. Call inside the writer's transaction"""
+    get_database().replicas.note_write(seller_id)  # Their next reads go to the primary, not a lagging replica
+    (
+        db.query(User)
+        .filter(User.id == seller_id)
+        .update({User.data_version: User.data_version + 1}, synchronize_session=False)
+    )
+
+
+def seller_version(db: Session, seller_id: int) -> int:
+    return db.query(User.data_version).filter(User.id == seller_id).scalar() or 0
+
+
+def make_etag(seller_id: int, version: int, *parts) -> str:
+    key = "|".join(str(part) for part in (seller_id, version, *parts))
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison per RFC 9110 — proxies sometimes add W/
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _json_response(etag: str, body: bytes, next_cursor) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def conditional_list(request: Request, db, seller_id: int, endpoint: str, params: tuple, load, serialize):
+    """
+    Answer a list GET with ETag/304 and the response cache.
+    load(session) -> (items, next_cursor) runs only on a miss; serialize(items) -> JSON bytes.
+    """
+    # Version first, rows after: a write wey lands in between only makes the body newer than its tag
+    version = await db.run(seller_version, seller_id)
+    etag = make_etag(seller_id, version, endpoint, *params)
+
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    if response_cache is not None:
+        cached = response_cache.get(etag)
+        if cached is not None:
+            return _json_response(etag, *cached)
+
+    items, next_cursor = await db.run(load)
+    body = serialize(items)
+    if response_cache is not None:
+        response_cache.set(etag, (body, next_cursor))
+    return _json_response(etag, body, next_cursor)
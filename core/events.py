@@ -0,0 +1,196 @@
+"""
+Live low-stock notifications for the /inventory/events SSE stream.
+
+record_sale works out which products just crossed their reorder point and
+publishes one event per product after commit. The hub fans events out to every
+open stream of that seller in this process.
+
+One worker: the default in-memory hub is enough. Several workers / instances on
+Postgres: set EVENTS_BACKEND=postgres — publish becomes NOTIFY and every worker
+LISTENs, so a sale on worker A reaches a dashboard connected to worker B.
+"""
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")  # memory or postgres
+NOTIFY_CHANNEL = "mkmart_events"
+SUBSCRIBER_QUEUE_SIZE = 100  # Slow client: extra events are dropped, not buffered forever
+RECONNECT_SECONDS = 5
+
+
+def crossed_low_stock(products: dict, sold: dict, stock_left: dict = None) -> list:
+    """
+    Low-stock events for products wey go from above their reorder point to at/below it.
+    `products` hold the stock from before the sale; `sold` is product_id -> units.
+    """
+    events = []
+    for product_id, units in sold.items():
+        product = products[product_id]
+        before = product.quantity_in_stock
+        after = stock_left[product_id] if stock_left is not None else before - units
+        if before > product.reorder_point >= after:
+            events.append({
+                "type": "low_stock",
+                "product_id": product_id,
+                "name": product.name,
+                "stock_left": after,
+                "reorder_point": product.reorder_point,
+                "reorder_quantity": product.reorder_quantity,
+            })
+    return events
+
+
+class LocalHub:
+    """In-process pub/sub: seller_id -> open stream queues"""
+
+    def __init__(self):
+        self._subscribers = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @asynccontextmanager
+    async def subscribe(self, seller_id: int):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(seller_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(seller_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[seller_id]
+
+    def _deliver(self, seller_id: int, event: dict):
+        for queue in list(self._subscribers.get(seller_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    async def publish(self, seller_id: int, events: list):
+        """Send events to this seller's open streams (call after the sale is committed)"""
+        for event in events:
+            self._deliver(seller_id, event)
+
+
+class PostgresHub(LocalHub):
+    """
+    Publish with pg_notify, deliver whatever LISTEN receives. Every worker (this one
+    too) gets each NOTIFY exactly once, so publish no touch local queues directly.
+    """
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._task = None
+        self._connection = None
+        self._lost = None
+        self._loop = None
+
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close()
+
+    async def publish(self, seller_id: int, events: list):
+        if events:
+            await asyncio.to_thread(self._notify, seller_id, events)
+
+    def _notify(self, seller_id: int, events: list):
+        with self.engine.begin() as conn:
+            for event in events:
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": NOTIFY_CHANNEL, "payload": json.dumps({"seller_id": seller_id, "event": event})},
+                )
+
+    def _connect(self):
+        # Dedicated psycopg2 connection outside the pool — LISTEN needs it kept forever
+        raw = self.engine.raw_connection()
+        raw.detach()
+        connection = raw.driver_connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return connection
+
+    def _close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                self._loop.remove_reader(connection.fileno())
+            except (ValueError, OSError):
+                pass
+            connection.close()
+
+    def _on_readable(self):
+        try:
+            self._connection.poll()
+        except Exception:
+            self._lost.set()  # Connection broke — let _listen reconnect
+            return
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            try:
+                message = json.loads(notify.payload)
+                self._deliver(message["seller_id"], message["event"])
+            except (ValueError, KeyError):
+                logger.warning("Bad event payload on %s: %r", NOTIFY_CHANNEL, notify.payload)
+
+    async def _listen(self):
+        while True:
+            try:
+                self._connection = await asyncio.to_thread(self._connect)
+                self._lost = asyncio.Event()
+                # No thread per listener: the loop wakes us when the socket get data
+                self._loop.add_reader(self._connection.fileno(), self._on_readable)
+                await self._lost.wait()
+                logger.warning("Event listener connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event listener failed, retrying in %ss", RECONNECT_SECONDS)
+            self._close()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+hub = None
+
+
+def get_hub() -> LocalHub:
+    global hub
+    if hub is None:
+        if EVENTS_BACKEND == "postgres":
+            from database import get_engine
+            hub = PostgresHub(get_engine())
+        else:
+            hub = LocalHub()
+    return hub
+
+
+def reset_hub():
+    """Forget the hub (call while it's stopped); the next one uses the current engine"""
+    global hub
+    hub = None
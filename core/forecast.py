@@ -0,0 +1,123 @@
+"""
+Sales velocity and days-of-cover forecasting for a seller's whole catalogue.
+
+One grouped query pulls units sold per product per day for the longest window,
+then NumPy does the rest on a products x days matrix: rolling-window velocities,
+an exponentially smoothed daily demand, and how many days current stock go last.
+NumPy is imported on first use — it's a big import most requests never need.
+"""
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Order, OrderItem, Product
+
+if TYPE_CHECKING:
+    import numpy as np
+
+WINDOWS = (7, 30, 90)
+
+
+def daily_units(db: Session, seller_id: int, days: int, today: date = None):
+    """
+    (products, matrix): the seller's products as (id, name, category, stock) rows and a
+    float array [len(products), days] of units sold per day, oldest day first.
+    """
+    import numpy as np
+
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+
+    products = (
+        db.query(Product.id, Product.name, Product.category, Product.quantity_in_stock)
+        .filter(Product.seller_id == seller_id)
+        .order_by(Product.id)
+        .all()
+    )
+    row_of = {product.id: index for index, product in enumerate(products)}
+
+    day = func.date(Order.created_at)
+    sold = (
+        db.query(OrderItem.product_id, day.label("day"), func.sum(OrderItem.quantity).label("units"))
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.seller_id == seller_id, Order.created_at >= datetime.combine(start, datetime.min.time()))
+        .group_by(OrderItem.product_id, day)
+        .all()
+    )
+
+    matrix = np.zeros((len(products), days))
+    if sold:
+        rows, cols, units = [], [], []
+        for product_id, sold_day, quantity in sold:
+            if product_id not in row_of:
+                continue
+            # SQLite gives "YYYY-MM-DD" strings, Postgres gives dates
+            offset = (date.fromisoformat(str(sold_day)) - start).days
+            if 0 <= offset < days:
+                rows.append(row_of[product_id])
+                cols.append(offset)
+                units.append(quantity)
+        np.add.at(matrix, (np.array(rows, dtype=int), np.array(cols, dtype=int)), np.array(units, dtype=float))
+
+    return products, matrix
+
+
+def smoothed_demand(matrix: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Simple exponential smoothing of each row's daily units, all rows at once.
+    Latest day weighs alpha, the one before alpha*(1-alpha), ... normalised to sum 1.
+    """
+    import numpy as np
+
+    days = matrix.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+    return matrix @ (weights / weights.sum())
+
+
+def forecast(
+    db: Session,
+    seller_id: int,
+    alpha: float = 0.3,
+    horizon_days: int = 30,
+    lead_time_days: int = 7,
+    today: date = None,
+):
+    """
+    Per-product velocity (units/day over 7/30/90 days), smoothed daily demand,
+    days of cover and a suggested reorder quantity to cover `horizon_days`.
+    Sorted most urgent (fewest days of cover) first.
+    """
+    import numpy as np
+
+    products, matrix = daily_units(db, seller_id, max(WINDOWS), today)
+    if not products:
+        return []
+
+    velocity = {window: matrix[:, -window:].sum(axis=1) / window for window in WINDOWS}
+    demand = smoothed_demand(matrix, alpha)
+    stock = np.array([product.quantity_in_stock for product in products], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(demand > 0, stock / demand, np.inf)
+    reorder = np.maximum(np.ceil(demand * (horizon_days + lead_time_days) - stock), 0)
+
+    order = np.argsort(cover, kind="stable")
+    return [
+        {
+            "product_id": products[i].id,
+            "name": products[i].name,
+            "category": products[i].category,
+            "stock_left": products[i].quantity_in_stock,
+            "velocity": {f"{window}d": round(float(velocity[window][i]), 3) for window in WINDOWS},
+            "daily_demand": round(float(demand[i]), 3),
+            "days_of_cover": None if math.isinf(cover[i]) else round(float(cover[i]), 1),
+            "needs_restock": bool(cover[i] <= lead_time_days),
+            "suggested_reorder_quantity": int(reorder[i]),
+        }
+        for i in order
+    ]
@@ -0,0 +1,95 @@
+"""
+Password hashing off the request path.
+
+Hash/verify run in a dedicated, size-bounded worker pool. When too many jobs are
+already waiting, new ones are refused at once with 503 instead of queueing forever,
+so a credential-stuffing burst cannot starve the event loop or Starlette's threadpool.
+
+    HASH_POOL=thread|process   (default thread — hashlib and argon2 release the GIL)
+    HASH_WORKERS               (default: CPU count)
+    HASH_MAX_PENDING           (default: 8 x workers, queued + running)
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+
+from core.security import hash_password, verify_and_update
+
+HASH_POOL = os.getenv("HASH_POOL", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+
+_executor = None
+_lock = threading.Lock()
+_stats = {"pending": 0, "completed": 0, "rejected": 0}
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            if HASH_POOL == "process":
+                _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hashing")
+        return _executor
+
+
+def _done(_future):
+    with _lock:
+        _stats["pending"] -= 1
+        _stats["completed"] += 1
+
+
+def _submit(fn, *args):
+    """Queue one job, or refuse with 503 if the pool is already full"""
+    executor = _get_executor()
+    with _lock:
+        if _stats["pending"] >= HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _stats["pending"] += 1
+
+    future = executor.submit(fn, *args)
+    future.add_done_callback(_done)
+    return future
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(hash_password, password))
+
+
+async def verify_and_update_async(password: str, hashed_password: str):
+    return await asyncio.wrap_future(_submit(verify_and_update, password, hashed_password))
+
+
+def hash_password_pooled(password: str) -> str:
+    """For sync handlers: same pool and backpressure, blocks until the hash is ready"""
+    return _submit(hash_password, password).result()
+
+
+def warm_up():
+    """Start every worker now (a process pool forks them on the first hash otherwise)"""
+    executor = _get_executor()
+    for future in [executor.submit(hash_password, "warm-up") for _ in range(HASH_WORKERS)]:
+        future.result()
+
+
+def pool_stats() -> dict:
+    """Queue depth and counters for monitoring"""
+    with _lock:
+        return {"workers": HASH_WORKERS, "max_pending": HASH_MAX_PENDING, **_stats}
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
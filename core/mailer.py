@@ -0,0 +1,298 @@
+"""
+Background email dispatcher.
+
+Routes call queue_email() to write a row into the email_outbox table (same
+transaction as the rest of their work) and return immediately. A single asyncio
+task per worker picks rows up, sends them in batches over one kept-open SMTP
+connection and retries failures with exponential backoff. Because the outbox lives
+in the DB, mails queued just before a crash or during an SMTP outage still go out.
+
+Any SMTP server works for local runs, e.g. `python -m aiosmtpd -n -l localhost:1025`
+with MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_STARTTLS=False USE_CREDENTIALS=False.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import EmailOutbox
+from settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = 3600
+POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "30"))  # Picks up retries and other workers' leftovers
+CLAIM_SECONDS = float(os.getenv("MAIL_CLAIM_SECONDS", "300"))  # Claimed rows come back if a worker dies mid-batch
+RETENTION_DAYS = float(os.getenv("MAIL_RETENTION_DAYS", "7"))  # Sent/failed rows are deleted after this
+PURGE_INTERVAL_SECONDS = float(os.getenv("MAIL_PURGE_INTERVAL_SECONDS", "3600"))
+PURGE_BATCH_SIZE = 1000
+
+
+def queue_email(db: Session, recipient: str, subject: str, body: str) -> EmailOutbox:
+    """Add a plain-text email to the outbox. Caller commits, then calls dispatcher.wake()"""
+    email = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    return email
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """5s, 10s, 20s, ... capped at one hour"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+class EmailDispatcher:
+    def __init__(self, hostname, port, sender, username=None, password=None,
+                 start_tls=True, use_tls=False, validate_certs=True, timeout=60):
+        self.hostname = hostname
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+
+        self._smtp = None
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._purged_at = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings):
+        return cls(
+            hostname=settings.mail_server,
+            port=settings.mail_port,
+            sender=settings.mail_from,
+            username=settings.mail_username if settings.use_credentials else None,
+            password=settings.mail_password if settings.use_credentials else None,
+            start_tls=settings.mail_starttls,
+            use_tls=settings.mail_ssl_tls,
+            validate_certs=settings.validate_certs,
+            timeout=settings.mail_timeout,
+        )
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        """Start the background task (call from inside the running event loop)"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._disconnect()
+
+    def wake(self):
+        """Tell the dispatcher new mail dey outbox. Safe from any thread; no-op if it never started"""
+        if self._queue is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            except RuntimeError:
+                pass  # Loop already closed (shutdown)
+
+    # --- sending ---------------------------------------------------------
+
+    async def _connection(self):
+        import aiosmtplib
+
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.hostname,
+                port=self.port,
+                use_tls=self.use_tls,
+                start_tls=self.start_tls,
+                validate_certs=self.validate_certs,
+                timeout=self.timeout,
+            )
+            await smtp.connect()
+            if self.username:
+                await smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    async def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            import aiosmtplib
+
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+    async def _send(self, email: EmailOutbox):
+        import aiosmtplib
+
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = email.recipient
+        message["Subject"] = email.subject
+        message.set_content(email.body)
+
+        smtp = await self._connection()
+        try:
+            await smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Kept-open connection died between batches — reconnect once
+            await self._disconnect()
+            smtp = await self._connection()
+            await smtp.send_message(message)
+
+    async def send_due(self) -> int:
+        """Send one batch of due outbox rows. Returns how many rows were handled"""
+        db = SessionLocal()
+        try:
+            # Claim and commit first: no row locks or open transaction while we wait on SMTP
+            emails = await asyncio.to_thread(self._claim_batch, db)
+            updates = []
+            for email in emails:
+                attempts = email.attempts + 1
+                try:
+                    await self._send(email)
+                except Exception as exc:
+                    # Any error counts as an attempt (bad config too), else the row retries forever
+                    update = {"id": email.id, "attempts": attempts, "last_error": str(exc)[:500]}
+                    if attempts >= MAX_ATTEMPTS:
+                        update["status"] = "failed"
+                        update["body"] = ""  # Bodies carry OTP codes — keep them only while we fit still send
+                        logger.error("Giving up on email %s to %s: %s", email.id, email.recipient, exc)
+                    else:
+                        update["next_attempt_at"] = datetime.utcnow() + retry_delay(attempts)
+                    # Connection state unknown after an error — start fresh next time
+                    await self._disconnect()
+                else:
+                    update = {
+                        "id": email.id, "attempts": attempts, "status": "sent",
+                        "sent_at": datetime.utcnow(), "body": "",
+                    }
+                updates.append(update)
+            if updates:
+                await asyncio.to_thread(self._save_results, db, updates)
+            return len(emails)
+        finally:
+            await asyncio.to_thread(db.close)
+
+    @staticmethod
+    def _claim_batch(db: Session):
+        """
+        Take due rows and push their next_attempt_at past CLAIM_SECONDS, so other workers
+        skip them while we send. SKIP LOCKED stops two workers claiming the same rows.
+        """
+        emails = (
+            db.query(
+                EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject,
+                EmailOutbox.body, EmailOutbox.attempts,
+            )
+            .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if emails:
+            db.query(EmailOutbox).filter(EmailOutbox.id.in_([email.id for email in emails])).update(
+                {EmailOutbox.next_attempt_at: datetime.utcnow() + timedelta(seconds=CLAIM_SECONDS)},
+                synchronize_session=False,
+            )
+        db.commit()
+        return emails
+
+    @staticmethod
+    def _save_results(db: Session, updates):
+        db.bulk_update_mappings(EmailOutbox, updates)
+        db.commit()
+
+    @staticmethod
+    def purge_old() -> int:
+        """Delete sent/failed rows older than RETENTION_DAYS in batches (blocking). Returns how many went"""
+        cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+        db = SessionLocal()
+        deleted = 0
+        try:
+            while True:
+                ids = [
+                    row.id for row in
+                    db.query(EmailOutbox.id)
+                    .filter(EmailOutbox.status != "pending", EmailOutbox.created_at < cutoff)
+                    .limit(PURGE_BATCH_SIZE)
+                ]
+                if not ids:
+                    break
+                db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()  # Short transactions, same as the OTP sweeper
+                deleted += len(ids)
+                if len(ids) < PURGE_BATCH_SIZE:
+                    break
+        finally:
+            db.close()
+        return deleted
+
+    async def _purge_if_due(self):
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        deleted = await asyncio.to_thread(self.purge_old)
+        if deleted:
+            logger.info("Purged %s old outbox emails", deleted)
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.send_due() == BATCH_SIZE:
+                    pass  # Full batch — more fit dey waiting
+                await self._purge_if_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email dispatcher batch failed")
+
+            # Sleep until new mail is queued or the poll interval passes
+            try:
+                await asyncio.wait_for(self._queue.get(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                await self._disconnect()  # Idle — servers drop idle connections anyway
+            # Many wake-ups while we were sending = one more pass
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+
+dispatcher = None
+
+
+def get_dispatcher() -> EmailDispatcher:
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = EmailDispatcher.from_settings(get_settings())
+    return dispatcher
+
+
+def reset_dispatcher():
+    """Forget the dispatcher (call while it's stopped); the next one uses the current settings"""
+    global dispatcher
+    dispatcher = None
@@ -0,0 +1,214 @@
+"""
+Per-request SQL and latency instrumentation.
+
+database.py hooks SQLAlchemy's cursor events to record_query(); MetricsMiddleware
+opens a RequestStats for every HTTP request (a contextvar, so the threadpool and
+run_sync both see it) and when the route is done:
+- adds `Server-Timing: db;dur=..;desc="N queries", app;dur=..` to the response,
+- feeds the Prometheus-style histograms served at GET /metrics,
+- checks the query budget: QUERY_BUDGET statements per request (0 = off),
+  QUERY_BUDGET_MODE=log (warn with the slowest statement) or raise (tests fail).
+QUERY_BUDGETS overrides per route, e.g. "GET /inventory/alerts/=8,POST /orders/bulk=20".
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "0"))
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")  # log or raise
+
+
+def _parse_budgets(raw: str) -> dict:
+    budgets = {}
+    for item in raw.split(","):
+        if "=" in item:
+            route, budget = item.rsplit("=", 1)
+            budgets[route.strip()] = int(budget)
+    return budgets
+
+
+QUERY_BUDGETS = _parse_budgets(os.getenv("QUERY_BUDGETS", ""))
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED = "unmatched"  # 404s etc. — one label so random paths no blow up /metrics
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str = ""
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def record_query(statement: str, seconds: float):
+    """Called from the engine's after_cursor_execute. No-op outside a request (startup, workers)"""
+    stats = _current.get()
+    if stats is None:
+        return
+    # Threadpool / run_sync work for one request runs one statement at a time, so no lock here
+    stats.queries += 1
+    stats.db_seconds += seconds
+    if seconds > stats.slowest_seconds:
+        stats.slowest_seconds = seconds
+        stats.slowest_statement = statement
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot = +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}  # (method, route) -> Histogram
+        self.queries = {}  # (method, route) -> Histogram
+        self.db_seconds = {}  # (method, route) -> total seconds
+        self.responses = {}  # (method, route, status) -> count
+        self.over_budget = {}  # (method, route) -> count
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats, over_budget: bool):
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(stats.queries)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+            self.responses[(*key, status)] = self.responses.get((*key, status), 0) + 1
+            if over_budget:
+                self.over_budget[key] = self.over_budget.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            _histogram(lines, "http_request_duration_seconds", "Request latency", self.latency)
+            _histogram(lines, "db_queries_per_request", "SQL statements per request", self.queries)
+            _counter(lines, "db_time_seconds_total", "Time spent in SQL", self.db_seconds)
+            _counter(lines, "http_responses_total", "Responses by status", self.responses)
+            _counter(lines, "query_budget_exceeded_total", "Requests over their query budget", self.over_budget)
+
+        from core import hashing
+        lines.append("# TYPE password_hash_pool gauge")
+        for name, value in hashing.pool_stats().items():
+            lines.append(f'password_hash_pool{{stat="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key) -> str:
+    names = ("method", "route", "status")
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, key))
+
+
+def _counter(lines, name, help_text, values):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in sorted(values.items()):
+        lines.append(f"{name}{{{_labels(key)}}} {value:g}")
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in sorted(histograms.items()):
+        labels = _labels(key)
+        cumulative = 0
+        for bound, count in zip((*hist.buckets, "+Inf"), hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {hist.total:g}")
+        lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+
+registry = Registry()
+
+
+def budget_for(method: str, route: str) -> int:
+    return QUERY_BUDGETS.get(f"{method} {route}", QUERY_BUDGET)
+
+
+def _server_timing(stats: RequestStats, seconds: float) -> bytes:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", app;dur={seconds * 1000:.1f}'
+    ).encode()
+
+
+class MetricsMiddleware:
+    """Wraps every HTTP request with a RequestStats; see module docstring"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # The route don finish by now (streaming bodies aside), so the numbers are complete
+                _check_budget(scope, stats)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            budget = budget_for(method, route)
+            over = bool(budget) and stats.queries > budget
+            registry.observe(method, route, status, time.perf_counter() - started, stats, over)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")  # Set by FastAPI once the path matched
+    return getattr(route, "path", None) or UNMATCHED
+
+
+def _check_budget(scope, stats: RequestStats):
+    method, route = scope["method"], _route_label(scope)
+    budget = budget_for(method, route)
+    if not budget or stats.queries <= budget:
+        return
+    message = (
+        f"{method} {route} ran {stats.queries} queries (budget {budget}), "
+        f"{stats.db_seconds * 1000:.1f} ms in DB; slowest {stats.slowest_seconds * 1000:.1f} ms: "
+        f"{' '.join(stats.slowest_statement.split())[:300]}"
+    )
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
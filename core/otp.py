@@ -1,41 +1,219 @@
-import random
+"""
+Email verification codes.
+
+Only an HMAC of the code is stored, compared in constant time. Each user has at most
+one live code (a new one replaces the old), looked up by the (user_id, expires_at)
+index, and a code dies after OTP_MAX_ATTEMPTS wrong guesses. Expired rows are
+deleted in batches by a background sweeper so the table no grow forever.
+
+OTP_BACKEND=db (default) keeps codes in the otp_codes table. OTP_BACKEND=memory keeps
+them in this process only — fine for one worker, codes are lost on restart.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
 from datetime import datetime, timedelta
+
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
+
+from database import SessionLocal
 from models import OTP, User
+from core.cache import TTLCache
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+OTP_BACKEND = os.getenv("OTP_BACKEND", "db")  # db or memory
+OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", "10"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_RESEND_SECONDS = int(os.getenv("OTP_RESEND_SECONDS", "60"))  # Min gap between codes for one user
+PURGE_INTERVAL_SECONDS = float(os.getenv("OTP_PURGE_INTERVAL_SECONDS", "600"))
+PURGE_BATCH_SIZE = int(os.getenv("OTP_PURGE_BATCH_SIZE", "1000"))
+
 
 def generate_otp(length: int = 6) -> str:
     """Generate a random numeric OTP"""
-    return ''.join(str(random.randint(0, 9)) for _ in range(length))
+    return ''.join(str(secrets.randbelow(10)) for _ in range(length))
+
+
+_fallback_pepper = None
+
+
+def _pepper() -> bytes:
+    """
+    OTP_PEPPER: a secret kept out of the DB and the source, so a leaked otp_codes table
+    no fit be brute-forced offline (6 digits = only a million guesses per user).
+    """
+    global _fallback_pepper
+    pepper = get_settings().otp_pepper
+    if pepper:
+        return pepper.encode()
+    if _fallback_pepper is None:
+        # Still secret, but other workers (and this one after a restart) no fit check these codes
+        logger.warning("OTP_PEPPER not set: using a random per-process key, set it when running more than one worker")
+        _fallback_pepper = secrets.token_bytes(32)
+    return _fallback_pepper
+
+
+def hash_code(user_id: int, code: str) -> str:
+    return hmac.new(_pepper(), f"{user_id}:{code.strip()}".encode(), hashlib.sha256).hexdigest()
+
+
+def _too_many_attempts():
+    return HTTPException(status_code=429, detail="Too many wrong codes. Request a new OTP.")
+
+
+def _resend_too_soon():
+    return HTTPException(status_code=429, detail=f"Wait {OTP_RESEND_SECONDS} seconds before requesting another OTP.")
+
+
+class DBOTPStore:
+    def save(self, db: Session, user_id: int, code_hash: str, expires_at: datetime):
+        # One live code per user — verify only ever look at one row
+        latest = (
+            db.query(OTP.created_at)
+            .filter(OTP.user_id == user_id, OTP.expires_at > datetime.utcnow())
+            .order_by(OTP.expires_at.desc())
+            .first()
+        )
+        if latest and latest.created_at and latest.created_at > datetime.utcnow() - timedelta(seconds=OTP_RESEND_SECONDS):
+            raise _resend_too_soon()
+        db.query(OTP).filter(OTP.user_id == user_id).delete(synchronize_session=False)
+        db.add(OTP(user_id=user_id, code_hash=code_hash, expires_at=expires_at, attempts=0,
+                   created_at=datetime.utcnow()))
+        db.commit()
+
+    def verify(self, db: Session, user_id: int, submitted_code: str) -> bool:
+        otp = (
+            db.query(OTP)
+            .filter(OTP.user_id == user_id, OTP.expires_at > datetime.utcnow())
+            .order_by(OTP.expires_at.desc())
+            .with_for_update()  # Parallel guesses queue up, so attempts count correctly
+            .first()
+        )
+        if otp is None:
+            return False
+        if otp.attempts >= OTP_MAX_ATTEMPTS:
+            db.rollback()
+            raise _too_many_attempts()
+
+        if hmac.compare_digest(otp.code_hash, hash_code(user_id, submitted_code)):
+            db.delete(otp)  # One-time use
+            db.commit()
+            return True
+
+        otp.attempts += 1
+        db.commit()
+        return False
 
-def create_and_save_otp(db: Session, user: User) -> OTP:
-    """Create OTP, save to DB, return the object"""
+    def purge(self) -> int:
+        """Delete expired codes in batches (own session). Returns how many rows went"""
+        db = SessionLocal()
+        deleted = 0
+        try:
+            while True:
+                ids = [
+                    row.id for row in
+                    db.query(OTP.id).filter(OTP.expires_at <= datetime.utcnow()).limit(PURGE_BATCH_SIZE)
+                ]
+                if not ids:
+                    break
+                db.query(OTP).filter(OTP.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()  # Short transactions — signups no wait behind one big DELETE
+                deleted += len(ids)
+                if len(ids) < PURGE_BATCH_SIZE:
+                    break
+        finally:
+            db.close()
+        return deleted
+
+
+class MemoryOTPStore:
+    def __init__(self, maxsize: int = 100000):
+        # user_id -> [code_hash, attempts, created_at (monotonic)]; entries expire by themselves
+        self._codes = TTLCache(maxsize=maxsize, ttl=OTP_TTL_MINUTES * 60)
+
+    def save(self, db: Session, user_id: int, code_hash: str, expires_at: datetime):
+        current = self._codes.get(user_id)
+        if current and current[2] > time.monotonic() - OTP_RESEND_SECONDS:
+            raise _resend_too_soon()
+        self._codes.set(user_id, [code_hash, 0, time.monotonic()])
+
+    def verify(self, db: Session, user_id: int, submitted_code: str) -> bool:
+        entry = self._codes.get(user_id)
+        if entry is None:
+            return False
+        if entry[1] >= OTP_MAX_ATTEMPTS:
+            raise _too_many_attempts()
+
+        if hmac.compare_digest(entry[0], hash_code(user_id, submitted_code)):
+            self._codes.pop(user_id)
+            return True
+        entry[1] += 1
+        return False
+
+    def purge(self) -> int:
+        return self._codes.purge_expired()
+
+
+store = MemoryOTPStore() if OTP_BACKEND == "memory" else DBOTPStore()
+
+
+def reset_store():
+    """Fresh store — the memory one keys codes by user id, which another database reuses"""
+    global store
+    store = MemoryOTPStore() if OTP_BACKEND == "memory" else DBOTPStore()
+
+
+def create_and_save_otp(db: Session, user: User) -> str:
+    """Make a new code for the user (replacing any old one) and return it for the email"""
     code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=10)  # 10 min expiry
-    
-    otp = OTP(
-        user_id=user.id,
-        code=code,
-        expires_at=expires_at,
-        attempts=0
-    )
-    
-    db.add(otp)
-    db.commit()
-    db.refresh(otp)
-    return otp
+    expires_at = datetime.utcnow() + timedelta(minutes=OTP_TTL_MINUTES)
+    store.save(db, user.id, hash_code(user.id, code), expires_at)
+    return code
+
 
 def verify_otp(db: Session, user_id: int, submitted_code: str) -> bool:
-    """Check if OTP is valid, not expired, and delete it after success"""
-    otp = db.query(OTP).filter(
-        OTP.user_id == user_id,
-        OTP.code == submitted_code,
-        OTP.expires_at > datetime.utcnow()
-    ).first()
-    
-    if otp:
-        # Success: delete OTP (one-time use)
-        db.delete(otp)
-        db.commit()
-        return True
-    
-    return False
\ No newline at end of file
+    """True if the code is right and still live (then it's used up). 429 after too many wrong tries"""
+    return store.verify(db, user_id, submitted_code)
+
+
+# --- expired-code sweeper ---------------------------------------------------
+
+_sweeper = None
+
+
+async def _sweep():
+    while True:
+        try:
+            deleted = await asyncio.to_thread(store.purge)
+            if deleted:
+                logger.info("Purged %s expired OTPs", deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("OTP purge failed")
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+
+def start_sweeper():
+    """Start the periodic purge (call from inside the running event loop)"""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_sweep())
+
+
+async def stop_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
+            pass
+        _sweeper = None
@@ -0,0 +1,190 @@
+"""
+Streaming catalogue import: CSV or NDJSON in, chunked upserts by (seller_id, sku) out.
+
+The request body is read as it arrives and parsed record by record, so memory
+depends on IMPORT_CHUNK_ROWS, not on file size. Each chunk is one batched
+INSERT ... ON CONFLICT (seller_id, sku) DO UPDATE and commits on its own.
+"""
+import codecs
+import csv
+import json
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from models import Product
+from schemas import ProductCreate
+from core.snapshots import mark_dirty
+from core.etags import bump_version
+
+IMPORT_CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 100
+MAX_RECORD_CHARS = 64 * 1024  # One CSV record, across all its lines
+
+_UPDATABLE = ["name", "description", "price", "quantity_in_stock", "category", "subcategory"]
+_OPTIONAL = {name for name, field in ProductCreate.model_fields.items() if not field.is_required()}
+
+
+async def _lines(chunks):
+    """Decode a byte stream into text lines without holding the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _still_quoted(line: str, quoted: bool) -> bool:
+    """
+    True if a CSV record is still inside a quoted field after this line. Same rules
+    as the csv module: a quote only opens a field at its start (so `55" TV` is just
+    text) and "" inside a quoted field is an escaped quote.
+    """
+    if not quoted and '"' not in line:
+        return False
+    field_start = not quoted
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quoted:
+            if char == '"':
+                if line[i + 1:i + 2] == '"':
+                    i += 1
+                else:
+                    quoted = False
+        elif char == '"' and field_start:
+            quoted = True
+        field_start = not quoted and char == ","
+        i += 1
+    return quoted
+
+
+async def iter_records(chunks, fmt: str):
+    """
+    Yield (row_number, dict) for every record, or (row_number, error message) when
+    the line itself no fit parse. CSV needs a header row; quoted fields fit span lines.
+    """
+    if fmt == "ndjson":
+        row_number = 0
+        async for line in _lines(chunks):
+            row_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield row_number, f"Invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield row_number, "Each line must be a JSON object"
+                continue
+            yield row_number, record
+        return
+
+    header = None
+    pending = []  # Lines of a CSV record wey still get an open quote
+    pending_chars = 0
+    quoted = False
+    row_number = 0
+    async for line in _lines(chunks):
+        row_number += 1
+        pending.append(line)
+        pending_chars += len(line) + 1
+        quoted = _still_quoted(line, quoted)
+        if quoted:
+            if pending_chars <= MAX_RECORD_CHARS:
+                continue  # Quoted field continues on the next line
+            # Stray quote most likely — no swallow the rest of the file
+            yield row_number - len(pending) + 1, f"Record longer than {MAX_RECORD_CHARS} characters (unclosed quote?)"
+            pending, pending_chars, quoted = [], 0, False
+            continue
+        text, start_row = "\n".join(pending), row_number - len(pending) + 1
+        pending, pending_chars = [], 0
+
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start_row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield start_row, dict(zip(header, values))
+
+    if pending:
+        yield row_number - len(pending) + 1, "Unclosed quote at end of file"
+
+
+def validate_record(record: dict):
+    """ProductCreate for a good row, else an error message"""
+    # Blank CSV cell = not given (else "" fails the int check for reorder_point etc.)
+    record = {
+        name: None if name in _OPTIONAL and isinstance(value, str) and not value.strip() else value
+        for name, value in record.items()
+    }
+    try:
+        product = ProductCreate(**record)
+    except ValidationError as exc:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        )
+    if not product.sku or not product.sku.strip():
+        return "sku is required for import"
+    return product
+
+
+def upsert_products(db: Session, seller_id: int, products: list) -> int:
+    """Insert new SKUs and overwrite existing ones in one batched statement; commits"""
+    # Same SKU twice in one chunk: last one wins (ON CONFLICT no fit touch a row twice)
+    rows = {
+        product.sku.strip(): {**product.dict(), "sku": product.sku.strip(), "seller_id": seller_id}
+        for product in products
+    }
+    if not rows:
+        return 0
+
+    # Reorder settings only overwrite existing products when every row in the chunk
+    # carries them — a file without those columns no go reset what the seller set
+    updatable = list(_UPDATABLE)
+    for name in ("reorder_point", "reorder_quantity"):
+        if all(row[name] is not None for row in rows.values()):
+            updatable.append(name)
+    for row in rows.values():
+        if row["reorder_point"] is None:
+            row["reorder_point"] = Product.__table__.c.reorder_point.default.arg
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(Product.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["seller_id", "sku"],
+            set_={name: stmt.excluded[name] for name in updatable},
+        )
+        # executemany: one cached statement, batched into multi-row VALUES by the driver layer
+        db.execute(stmt, list(rows.values()))
+    else:
+        existing = {
+            product.sku: product
+            for product in db.query(Product).filter(Product.seller_id == seller_id, Product.sku.in_(rows))
+        }
+        for sku, row in rows.items():
+            if sku in existing:
+                for name in updatable:
+                    setattr(existing[sku], name, row[name])
+            else:
+                db.add(Product(**row))
+
+    mark_dirty(db, seller_id)  # Stock/names fit change for products in the alerts
+    bump_version(db, seller_id)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,231 @@
+"""
+Rate limits for the auth endpoints (token buckets).
+
+Two layers:
+- per client IP, in RateLimitMiddleware — checked before the body is read, so a
+  flood never reaches JSON parsing, the DB or password hashing;
+- per account (email or user id), in the route via enforce_account() — stops one
+  account being brute-forced from many IPs.
+
+Each bucket holds `burst` tokens and refills at burst/per_seconds tokens a second;
+a request takes one token or gets 429 with Retry-After.
+
+RATE_LIMIT_BACKEND=memory (default) keeps buckets in this process: O(1) per hit,
+LRU-bounded to RATE_LIMIT_MAX_KEYS. With several workers each one counts on its own,
+so set RATE_LIMIT_BACKEND=redis + RATE_LIMIT_REDIS_URL (pip install redis) to share.
+Redis hits from the middleware and async routes run in the threadpool, so a slow
+Redis never stalls the event loop.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory or redis
+MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# How many proxies (Render's router = 1) add themselves to X-Forwarded-For in front of us.
+# 0 = use the socket address. The client fit fake everything left of those entries.
+TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+
+@dataclass(frozen=True)
+class Limit:
+    burst: int  # Requests allowed back to back
+    per_seconds: float  # Time to refill the whole burst
+
+    @property
+    def rate(self) -> float:
+        return self.burst / self.per_seconds
+
+
+# Per client IP, by path
+IP_LIMITS = {
+    "/users/login": Limit(20, 60),
+    "/users/signup": Limit(5, 600),
+    "/users/verify-otp": Limit(20, 60),
+    "/users/resend-otp": Limit(5, 600),
+}
+
+# Per account, by action
+ACCOUNT_LIMITS = {
+    "login": Limit(5, 300),  # Per email
+    "signup": Limit(3, 3600),  # Per email
+    "verify-otp": Limit(10, 600),  # Per user id (OTP attempts are also capped per code)
+    "resend-otp": Limit(3, 3600),  # Per user id
+}
+
+
+class MemoryBackend:
+    blocking = False  # hit() does no I/O — fine to call on the event loop
+
+    def __init__(self, maxsize: int = MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time), least recently used first
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: Limit) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until the next token"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens, now)
+            # Evicting an old bucket only forgets it — worst case that key starts full again
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+# Same token bucket as MemoryBackend, atomic inside Redis. Key expires once it would be full again
+_REDIS_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    blocking = True  # hit() waits on the network (up to socket_timeout)
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency — only needed for this backend
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+
+    def hit(self, key: str, limit: Limit) -> float:
+        try:
+            return float(self._script(keys=[f"rl:{key}"], args=[limit.burst, limit.rate, time.time()]))
+        except Exception:
+            # Redis down: let the request through rather than lock everybody out of login
+            logger.exception("Rate limit backend unavailable")
+            return 0.0
+
+
+backend = None
+
+
+def get_backend():
+    global backend
+    if backend is None:
+        if RATE_LIMIT_BACKEND == "redis":
+            backend = RedisBackend(os.environ["RATE_LIMIT_REDIS_URL"])
+        else:
+            backend = MemoryBackend()
+    return backend
+
+
+def reset_backend():
+    """Forget the limiter state; the next request starts a fresh backend"""
+    global backend
+    backend = None
+
+
+async def hit_async(key: str, limit: Limit) -> float:
+    """backend.hit() for async code: Redis goes through the threadpool, memory stays inline"""
+    backend = get_backend()
+    if backend.blocking:
+        return await run_in_threadpool(backend.hit, key, limit)
+    return backend.hit(key, limit)
+
+
+def _retry_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+def _account_key(action: str, account) -> str:
+    return f"account:{action}:{str(account).strip().lower()}"
+
+
+def _account_limited(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many attempts for this account. Try again later.",
+        headers={"Retry-After": _retry_header(retry_after)},
+    )
+
+
+def enforce_account(action: str, account) -> None:
+    """Raise 429 if this account used up its `action` limit. Call before any DB/hash work (sync routes)"""
+    limit = ACCOUNT_LIMITS.get(action)
+    if not RATE_LIMIT_ENABLED or limit is None:
+        return
+    retry_after = get_backend().hit(_account_key(action, account), limit)
+    if retry_after:
+        raise _account_limited(retry_after)
+
+
+async def enforce_account_async(action: str, account) -> None:
+    """enforce_account() for async routes"""
+    limit = ACCOUNT_LIMITS.get(action)
+    if not RATE_LIMIT_ENABLED or limit is None:
+        return
+    retry_after = await hit_async(_account_key(action, account), limit)
+    if retry_after:
+        raise _account_limited(retry_after)
+
+
+def client_ip(scope) -> str:
+    if TRUSTED_PROXIES:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops:
+                    return hops[-min(TRUSTED_PROXIES, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Per-IP limits for IP_LIMITS paths; everything else passes straight through"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = IP_LIMITS.get(scope.get("path")) if scope["type"] == "http" and RATE_LIMIT_ENABLED else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        retry_after = await hit_async(f"ip:{scope['path']}:{client_ip(scope)}", limit)
+        if not retry_after:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({"detail": "Too many requests. Slow down small."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", _retry_header(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,174 @@
+"""
+Per-seller sales rollups (product revenue, category revenue, daily buckets).
+
+record_sale calls add_order_to_rollups before its commit, so the rollups move
+together with the Order/OrderItem rows. If they ever drift (or for old data
+recorded before the tables existed) rebuild them with:
+
+    python -m core.rollups            # every seller
+    python -m core.rollups 42 43      # only sellers 42 and 43
+"""
+import sys
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Order, OrderItem, Product, User, ProductSales, CategorySales, DailySales
+
+
+def _add_to(db: Session, model, keys: list, rows: list):
+    """
+    UPSERT `column = column + value` for many rollup rows. `keys` are the primary key
+    columns, every other column in a row is treated as a delta.
+    """
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    deltas = [name for name in rows[0] if name not in keys]
+
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        # One multi-row INSERT ... ON CONFLICT DO UPDATE for the whole batch
+        table = model.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    # Other databases: update first, insert if the row no dey yet
+    for row in rows:
+        updated = (
+            db.query(model)
+            .filter_by(**{name: row[name] for name in keys})
+            .update({getattr(model, name): getattr(model, name) + row[name] for name in deltas},
+                    synchronize_session=False)
+        )
+        if not updated:
+            db.add(model(**row))
+            db.flush()
+
+
+def add_order_to_rollups(db: Session, seller_id: int, day: date, items, products: dict):
+    """
+    Fold one order into the seller's rollups. `items` are OrderItem rows (or anything
+    with product_id/quantity/price_at_purchase), `products` maps product_id -> Product.
+    Does not commit — caller commits together with the order.
+    """
+    add_orders_to_rollups(db, seller_id, [(day, items)], products)
+
+
+def add_orders_to_rollups(db: Session, seller_id: int, orders, products: dict):
+    """Same as add_order_to_rollups for many orders at once, given as (day, items) pairs"""
+    product_totals = defaultdict(lambda: [0.0, 0])
+    category_totals = defaultdict(lambda: [0.0, 0])
+    day_totals = defaultdict(lambda: [0.0, 0, 0])
+
+    for day, items in orders:
+        day_totals[day][2] += 1
+        for item in items:
+            revenue = item.quantity * item.price_at_purchase
+            category = products[item.product_id].category
+            product_totals[item.product_id][0] += revenue
+            product_totals[item.product_id][1] += item.quantity
+            category_totals[category][0] += revenue
+            category_totals[category][1] += item.quantity
+            day_totals[day][0] += revenue
+            day_totals[day][1] += item.quantity
+
+    # Sorted keys so concurrent orders lock rollup rows in the same order
+    _add_to(db, ProductSales, ["seller_id", "product_id"], [
+        {"seller_id": seller_id, "product_id": product_id, "revenue": revenue, "units_sold": units}
+        for product_id, (revenue, units) in sorted(product_totals.items())
+    ])
+    _add_to(db, CategorySales, ["seller_id", "category"], [
+        {"seller_id": seller_id, "category": category, "revenue": revenue, "units_sold": units}
+        for category, (revenue, units) in sorted(category_totals.items())
+    ])
+    _add_to(db, DailySales, ["seller_id", "day"], [
+        {"seller_id": seller_id, "day": day, "revenue": revenue, "units_sold": units, "order_count": count}
+        for day, (revenue, units, count) in sorted(day_totals.items())
+    ])
+
+
+def rebuild_rollups(db: Session, seller_id: int):
+    """Recompute one seller's rollups from orders/order_items (backfill or repair)"""
+    for model in (ProductSales, CategorySales, DailySales):
+        db.query(model).filter(model.seller_id == seller_id).delete(synchronize_session=False)
+
+    revenue = func.sum(OrderItem.quantity * OrderItem.price_at_purchase)
+    units = func.sum(OrderItem.quantity)
+    sold = (
+        db.query(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.seller_id == seller_id)
+    )
+
+    db.bulk_insert_mappings(ProductSales, [
+        {"seller_id": seller_id, "product_id": row.product_id, "revenue": row.revenue, "units_sold": row.units}
+        for row in sold.with_entities(OrderItem.product_id, revenue.label("revenue"), units.label("units"))
+        .group_by(OrderItem.product_id)
+    ])
+
+    db.bulk_insert_mappings(CategorySales, [
+        {"seller_id": seller_id, "category": row.category, "revenue": row.revenue, "units_sold": row.units}
+        for row in sold.join(Product, Product.id == OrderItem.product_id)
+        .with_entities(Product.category, revenue.label("revenue"), units.label("units"))
+        .group_by(Product.category)
+    ])
+
+    # Orders without items still get a bucket so "has sales" stays a rollup lookup
+    day = func.date(Order.created_at)
+    item_totals = {
+        str(row.day): row
+        for row in sold.with_entities(day.label("day"), revenue.label("revenue"), units.label("units"))
+        .group_by(day)
+    }
+    buckets = []
+    for row in (
+        db.query(day.label("day"), func.count(Order.id).label("orders"))
+        .filter(Order.seller_id == seller_id)
+        .group_by(day)
+    ):
+        totals = item_totals.get(str(row.day))
+        buckets.append({
+            "seller_id": seller_id,
+            "day": date.fromisoformat(str(row.day)),
+            "revenue": totals.revenue if totals else 0.0,
+            "units_sold": totals.units if totals else 0,
+            "order_count": row.orders,
+        })
+    db.bulk_insert_mappings(DailySales, buckets)
+    # From here record_sale's deltas keep them complete — no more lazy backfill for this seller
+    db.query(User).filter(User.id == seller_id).update({User.rollups_built: True}, synchronize_session=False)
+
+
+def rebuild_all(db: Session, seller_ids=None):
+    """Rebuild rollups seller by seller, one commit each so a big backfill no hold locks forever"""
+    if not seller_ids:
+        seller_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+    for seller_id in seller_ids:
+        rebuild_rollups(db, seller_id)
+        db.commit()
+    return len(seller_ids)
+
+
+if __name__ == "__main__":
+    from database import Base, SessionLocal, get_engine
+
+    Base.metadata.create_all(bind=get_engine())
+    db = SessionLocal()
+    try:
+        count = rebuild_all(db, [int(arg) for arg in sys.argv[1:]])
+        print(f"Rebuilt sales rollups for {count} seller(s)")
+    finally:
+        db.close()
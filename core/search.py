@@ -0,0 +1,155 @@
+"""
+Product full-text search with price/stock filters and category facets.
+
+Postgres: GIN index on to_tsvector(name, description, category, subcategory).
+SQLite:   FTS5 table kept in sync with `products` by triggers (local runs).
+Anything else falls back to LIKE, which works but scans.
+"""
+import re
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.orm import Session
+
+from models import Product
+
+TS_CONFIG = "simple"  # No stemming — product names/brands no be English prose
+FTS_TABLE = "products_fts"
+
+# Literal SQL (not bound params) so the query expression matches the GIN index expression
+_space = literal_column("' '")
+_search_document = (
+    Product.name + _space + Product.description + _space + Product.category + _space + Product.subcategory
+)
+_ts_config = literal_column(f"'{TS_CONFIG}'")
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+
+def setup_search(engine):
+    """Create the search index for this database (idempotent — runs on every boot)"""
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN "
+                f"(to_tsvector('{TS_CONFIG}', name || ' ' || description || ' ' || category || ' ' || subcategory))"
+            ))
+
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": FTS_TABLE}).first()
+            if exists:
+                return
+
+            columns = "name, description, category, subcategory"
+            new_values = "new.name, new.description, new.category, new.subcategory"
+            old_values = "old.name, old.description, old.category, old.subcategory"
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='products', content_rowid='id')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON products BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON products BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+            ))
+            # Only text columns — stock updates on every sale no need reindex
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {columns} ON products BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            ))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _terms(q: str) -> list:
+    """Split the user's text into plain word tokens (drops query-syntax characters)"""
+    return re.findall(r"\w+", q.lower())
+
+
+def _match(db: Session, query, terms: list):
+    """Add the full-text condition and relevance order for this dialect"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # Prefix match on every word: "sams gal" finds "Samsung Galaxy"
+        document = func.to_tsvector(_ts_config, _search_document)
+        ts_query = func.to_tsquery(_ts_config, " & ".join(f"{term}:*" for term in terms))
+        return (
+            query.filter(document.op("@@")(ts_query)),
+            func.ts_rank(document, ts_query).desc(),
+        )
+
+    if dialect == "sqlite":
+        fts_query = " ".join(f'"{term}"*' for term in terms)
+        return (
+            query.join(_fts, _fts.c.rowid == Product.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(fts_query)),
+            _fts.c.rank,  # bm25 — lower is better
+        )
+
+    for term in terms:
+        query = query.filter(_search_document.ilike(f"%{term}%"))
+    return query, Product.id
+
+
+def search_products(
+    db: Session,
+    seller_id: int,
+    q: str = None,
+    category: str = None,
+    subcategory: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    in_stock: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Matching products (best match first), total match count and category/subcategory
+    facet counts. Facets ignore the category/subcategory filters themselves so the
+    client fit show the other options.
+    """
+    base = db.query(Product).filter(Product.seller_id == seller_id)
+    if min_price is not None:
+        base = base.filter(Product.price >= min_price)
+    if max_price is not None:
+        base = base.filter(Product.price <= max_price)
+    if in_stock:
+        base = base.filter(Product.quantity_in_stock > 0)
+
+    order_by = Product.id
+    terms = _terms(q) if q else []
+    if terms:
+        base, order_by = _match(db, base, terms)
+
+    def facet(field, *filters):
+        return dict(
+            base.filter(*filters)
+            .with_entities(field, func.count())
+            .group_by(field)
+            .all()
+        )
+
+    category_facets = facet(Product.category, *([Product.subcategory == subcategory] if subcategory else []))
+    subcategory_facets = facet(Product.subcategory, *([Product.category == category] if category else []))
+
+    matches = base
+    if category:
+        matches = matches.filter(Product.category == category)
+    if subcategory:
+        matches = matches.filter(Product.subcategory == subcategory)
+
+    # Subcategory facets already carry the category filter, so no extra COUNT query
+    total = subcategory_facets.get(subcategory, 0) if subcategory else sum(subcategory_facets.values())
+
+    results = matches.order_by(order_by, Product.id).limit(limit).offset(offset).all()
+
+    return {
+        "total": total,
+        "results": results,
+        "facets": {"category": category_facets, "subcategory": subcategory_facets},
+    }
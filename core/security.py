@@ -1,14 +1,37 @@
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
+import os
 
 SECRET_KEY = "your_super_secret_key_here_change_it"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Put is_verified inside the token too, so a cold auth cache no need DB at all.
+# Trade-off: revoking tokens then only works inside one worker (others wait for expiry).
+EMBED_USER_CLAIMS = os.getenv("AUTH_EMBED_CLAIMS", "False").lower() in ("true", "1", "yes")
+
+# PASSWORD_SCHEME=argon2 switches new hashes to argon2; old pbkdf2 hashes still verify
+# and get upgraded on next login (deprecated="auto" marks every non-default scheme old).
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "pbkdf2_sha256")
+
+def _cost_settings() -> dict:
+    """Optional hash cost tuning from env, e.g. ARGON2_TIME_COST=3 ARGON2_MEMORY_COST=65536"""
+    settings = {}
+    for env_name, setting in (
+        ("ARGON2_TIME_COST", "argon2__time_cost"),
+        ("ARGON2_MEMORY_COST", "argon2__memory_cost"),
+        ("ARGON2_PARALLELISM", "argon2__parallelism"),
+        ("PBKDF2_ROUNDS", "pbkdf2_sha256__default_rounds"),
+    ):
+        if os.getenv(env_name):
+            settings[setting] = int(os.getenv(env_name))
+    return settings
+
 pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto"
+    schemes=list(dict.fromkeys([PASSWORD_SCHEME, "pbkdf2_sha256"])),
+    deprecated="auto",
+    **_cost_settings()
 )
 
 def hash_password(password: str) -> str:
@@ -17,7 +40,18 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
+def verify_and_update(password: str, hashed_password: str):
+    """(ok, new_hash) — new_hash is set when the stored hash uses an old scheme or cost"""
+    return pwd_context.verify_and_update(password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta):
     payload = data.copy()
     payload["exp"] = datetime.utcnow() + expires_delta
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+def user_token_claims(user) -> dict:
+    """JWT claims for a user: id + token version (and verified flag if EMBED_USER_CLAIMS)"""
+    claims = {"sub": str(user.id), "ver": user.token_version or 0}
+    if EMBED_USER_CLAIMS:
+        claims["verified"] = bool(user.is_verified)
+    return claims
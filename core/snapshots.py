@@ -0,0 +1,157 @@
+"""
+Precomputed restock alerts (the /inventory/alerts/ payload) per seller.
+
+Sales and product imports call mark_dirty() inside their own transaction — one
+upsert that bumps alert_snapshots.dirty_version — then wake the refresher after
+commit. The refresher recomputes every dirty seller once per pass, so a burst of
+100 sales = one recompute, not 100. The dashboard just reads the stored payload;
+if a refresh is still pending it gets the last good one.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import AlertSnapshot
+from core.analytics import restock_alerts
+from core.rollups import _add_to
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "100"))
+DEBOUNCE_SECONDS = float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "1"))  # Let a burst of sales land first
+POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "60"))  # Picks up marks from other workers
+
+
+def mark_dirty(db: Session, seller_id: int):
+    """Flag the seller's alerts as stale. Caller commits, then calls refresher.wake()"""
+    _add_to(db, AlertSnapshot, ["seller_id"], [{"seller_id": seller_id, "dirty_version": 1}])
+
+
+def refresh(db: Session, seller_id: int) -> dict:
+    """Recompute one seller's alerts and store them (commits). Returns the payload"""
+    version = db.query(AlertSnapshot.dirty_version).filter(AlertSnapshot.seller_id == seller_id).scalar()
+    payload = restock_alerts(db, seller_id)
+    now = datetime.utcnow()
+
+    if version is None:
+        db.add(AlertSnapshot(
+            seller_id=seller_id, payload=payload, dirty_version=0, computed_version=0, computed_at=now
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # A sale created the row meanwhile — it's marked dirty, the refresher go redo it
+            db.rollback()
+        return payload
+
+    # Marks wey land while we were computing push dirty_version past `version`, so the
+    # row stays dirty. The guard stops a slow refresh from overwriting a newer one.
+    (
+        db.query(AlertSnapshot)
+        .filter(AlertSnapshot.seller_id == seller_id, AlertSnapshot.computed_version <= version)
+        .update({"payload": payload, "computed_version": version, "computed_at": now},
+                synchronize_session=False)
+    )
+    db.commit()
+    return payload
+
+
+def read_alerts(db: Session, seller_id: int, compute_missing: bool = True):
+    """
+    The seller's alerts from the snapshot — one primary key lookup.
+    With compute_missing=False (read replica) a missing snapshot returns None instead.
+    """
+    snapshot = (
+        db.query(AlertSnapshot.payload, AlertSnapshot.dirty_version, AlertSnapshot.computed_version)
+        .filter(AlertSnapshot.seller_id == seller_id)
+        .first()
+    )
+    if snapshot is None or snapshot.payload is None:
+        if not compute_missing:
+            return None
+        return refresh(db, seller_id)  # First visit: nothing to serve yet, compute now
+
+    if snapshot.dirty_version > snapshot.computed_version:
+        refresher.wake()  # Mark came from another worker process — nudge ours
+    return snapshot.payload
+
+
+class SnapshotRefresher:
+    def __init__(self):
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Start the background task (call from inside the running event loop)"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Tell the refresher some seller dey dirty. Safe from any thread; no-op if never started"""
+        if self._queue is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            except RuntimeError:
+                pass  # Loop already closed (shutdown)
+
+    def refresh_dirty(self) -> int:
+        """Recompute one batch of dirty sellers (blocking). Returns how many were refreshed"""
+        db = SessionLocal()
+        try:
+            seller_ids = [
+                row.seller_id
+                for row in db.query(AlertSnapshot.seller_id)
+                .filter(AlertSnapshot.dirty_version > AlertSnapshot.computed_version)
+                .order_by(AlertSnapshot.seller_id)
+                .limit(BATCH_SIZE)
+            ]
+            refreshed = 0
+            for seller_id in seller_ids:
+                try:
+                    refresh(db, seller_id)
+                    refreshed += 1
+                except Exception:
+                    db.rollback()
+                    logger.exception("Alert snapshot refresh failed for seller %s", seller_id)
+            return refreshed
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                while await asyncio.to_thread(self.refresh_dirty) == BATCH_SIZE:
+                    pass  # Full batch — more sellers fit dey waiting
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Alert snapshot refresh pass failed")
+
+            try:
+                await asyncio.wait_for(self._queue.get(), timeout=POLL_SECONDS)
+                await asyncio.sleep(DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            # All the wake-ups from the burst = one pass
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+
+refresher = SnapshotRefresher()
@@ -0,0 +1,39 @@
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from models import Product
+
+
+def lock_products(db: Session, seller_id: int, product_ids) -> dict:
+    """
+    Load all the seller's products for an order in one IN (...) query and lock the rows
+    (SELECT ... FOR UPDATE, ordered by id so two checkouts never deadlock each other).
+    Returns product_id -> Product; ids wey no belong to the seller are simply missing.
+    """
+    products = (
+        db.query(Product)
+        .filter(Product.id.in_(set(product_ids)), Product.seller_id == seller_id)
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    )
+    return {product.id: product for product in products}
+
+
+def decrement_stock(db: Session, quantities: dict) -> bool:
+    """
+    Take `quantities` (product_id -> units) out of stock with one conditional UPDATE:
+        SET quantity_in_stock = quantity_in_stock - q WHERE quantity_in_stock >= q
+    Returns False if any product no get enough stock — caller must roll back.
+    """
+    if not quantities:
+        return True
+
+    ordered = case(quantities, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(quantities.keys()), Product.quantity_in_stock >= ordered)
+        .values(quantity_in_stock=Product.quantity_in_stock - ordered)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantities)
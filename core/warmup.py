@@ -0,0 +1,98 @@
+"""
+Warm-up so a fresh worker's first requests are not the slow ones.
+
+warm_up() runs as the last startup hook, before the worker takes traffic:
+- opens DB_WARM_CONNECTIONS pool connections on every engine (primary, async, replicas),
+- configures the ORM mappers and builds the OpenAPI schema (both lazy otherwise),
+- starts the password hashing workers (a process pool forks them on first login otherwise).
+Pydantic schemas are already compiled at import (no defer_build anywhere).
+GET /health/ready answers 503 until this is done (app.state.warm), and whenever the primary no answer.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from database import get_database, get_engine
+from core import hashing
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+WARM_CONNECTIONS = os.getenv("DB_WARM_CONNECTIONS")  # Default: the pool size
+
+
+def _warm_count(engine) -> int:
+    size = getattr(engine.pool, "size", None)  # QueuePool only; SQLite memory pools have no size
+    wanted = int(WARM_CONNECTIONS) if WARM_CONNECTIONS else get_settings().db_pool_size
+    return min(wanted, size()) if size else 1
+
+
+def _warm_sync(engine):
+    connections = []
+    try:
+        for _ in range(_warm_count(engine)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()  # Back to the pool, still open
+
+
+async def _warm_async(engine):
+    connections = []
+    try:
+        for _ in range(_warm_count(engine.sync_engine)):
+            connection = await engine.connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def _warm_replica(replicas, replica):
+    try:
+        await asyncio.to_thread(_warm_sync, replica.engine)
+        if replica.async_engine is not None:
+            await _warm_async(replica.async_engine)
+    except Exception:
+        replicas.mark_down(replica)  # Reads use the primary until it comes back
+
+
+async def warm_up(app):
+    started = time.perf_counter()
+
+    db = get_database()
+    await asyncio.to_thread(_warm_sync, db.engine)
+    if db.async_engine is not None:
+        await _warm_async(db.async_engine)
+    for replica in db.replicas.replicas:
+        await _warm_replica(db.replicas, replica)
+
+    configure_mappers()
+    app.openapi()
+    await asyncio.to_thread(hashing.warm_up)
+
+    app.state.warm = True
+    logger.info("Warm-up done in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+def _ping():
+    with get_engine().connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def is_ready(app) -> bool:
+    if not getattr(app.state, "warm", False):
+        return False
+    try:
+        await asyncio.to_thread(_ping)
+    except Exception:
+        logger.exception("Readiness check: primary database unreachable")
+        return False
+    return True
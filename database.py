@@ -1,25 +1,249 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from starlette.concurrency import run_in_threadpool
+import itertools
+import logging
+import threading
+import time
 
-load_dotenv()
+from core.cache import TTLCache
+from settings import Settings, get_settings
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+logger = logging.getLogger(__name__)
 
-if not SQLALCHEMY_DATABASE_URL:
-    raise ValueError("DATABASE_URL not set in environment variables. Check .env or Render dashboard.")
+Base = declarative_base()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def _pool_settings(settings: Settings, url: str) -> dict:
+    """Connection pool tuning (SQLite keeps SQLAlchemy's own defaults)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _async_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..., sqlite://... -> sqlite+aiosqlite://..."""
+    scheme, rest = url.split("://", 1)
+    driver = "sqlite+aiosqlite" if scheme.startswith("sqlite") else "postgresql+asyncpg"
+    return f"{driver}://{rest}"
 
-Base = declarative_base()
+def _instrument(sync_engine):
+    """Time every statement for the per-request stats in core/metrics.py"""
+    from core.metrics import record_query
+
+    # Start time lives on the statement's own context: a statement wey fails never
+    # reaches _after, and per-connection state would keep its start time forever
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            record_query(statement, time.perf_counter() - started)
+
+def _async_engine(settings: Settings, url: str, async_url: str = ""):
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(async_url or _async_url(url), **_pool_settings(settings, url))
+    _instrument(engine.sync_engine)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, autoflush=False)
+
+class Replica:
+    async_engine = None
+
+    def __init__(self, settings: Settings, url: str):
+        self.engine = create_engine(url, **_pool_settings(settings, url))
+        _instrument(self.engine)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        if settings.db_async:
+            self.async_engine, self.async_sessions = _async_engine(settings, url)
+        self.down_until = 0.0
+
+    def new_session(self):
+        return self.async_sessions() if self.async_engine is not None else self.sessions()
+
+class ReplicaSet:
+    """
+    Picks a replica for read-only work (DATABASE_REPLICA_URLS): round-robin over the healthy ones.
+    A replica wey fails sits out REPLICA_RETRY_SECONDS; with none healthy, reads go to the primary.
+    A seller's reads also stay on the primary for REPLICA_STICKY_SECONDS after their last
+    write (same request included), so they always see their own sales despite replica lag.
+    """
+
+    def __init__(self, settings: Settings):
+        self.replicas = [Replica(settings, url) for url in settings.replica_urls]
+        self.retry_seconds = settings.replica_retry_seconds
+        self._next = itertools.count()
+        self._recent_writers = TTLCache(maxsize=100000, ttl=settings.replica_sticky_seconds)
+
+    def note_write(self, seller_id: int):
+        if self.replicas:
+            self._recent_writers.set(seller_id, True)
+
+    def choose(self, seller_id: int = None):
+        """A replica for this seller's reads, or None for the primary"""
+        if not self.replicas or (seller_id is not None and self._recent_writers.get(seller_id)):
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if replica.down_until <= now:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica):
+        replica.down_until = time.monotonic() + self.retry_seconds
+        logger.warning("Replica %r failed, reads go to the primary for %ss", replica.engine.url, self.retry_seconds)
+
+class Database:
+    """
+    Engines and session factories for one Settings. Nothing connects at import:
+    get_database() builds this on first use (startup, first request, a script).
+    The sync engine always exists — startup, the order export and background jobs use it;
+    db_async adds an async engine (asyncpg / aiosqlite) for the product/order/inventory routes.
+    """
+
+    def __init__(self, settings: Settings):
+        if not settings.database_url:
+            raise ValueError("DATABASE_URL not set in environment variables. Check .env or Render dashboard.")
+        url = settings.database_url
+        self.is_async = settings.db_async
+        self.engine = create_engine(url, **_pool_settings(settings, url))
+        _instrument(self.engine)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = None
+        if self.is_async:
+            self.async_engine, self.async_sessions = _async_engine(settings, url, settings.database_async_url)
+        self.replicas = ReplicaSet(settings)
+
+    def primary_session(self):
+        return self.async_sessions() if self.is_async else self.sessions()
+
+_database = None
+_lock = threading.Lock()
+
+def get_database() -> Database:
+    global _database
+    if _database is None:
+        with _lock:
+            if _database is None:
+                _database = Database(get_settings())
+    return _database
+
+def reset_database():
+    """Drop the engines; the next get_database() builds new ones from the current settings"""
+    global _database
+    database, _database = _database, None
+    if database is not None:
+        database.engine.dispose()
+
+def get_engine():
+    return get_database().engine
+
+def SessionLocal():
+    """New sync Session on the primary (was a module-level sessionmaker — callers just call it)"""
+    return get_database().sessions()
+
+def read_session(seller_id: int = None):
+    """Sync Session for a read-only job (export): a replica when one is up, else the primary"""
+    replica = get_database().replicas.choose(seller_id)
+    return replica.sessions() if replica else SessionLocal()
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+class DBRunner:
+    """
+    Runs ORM code written for a normal Session on whichever engine is configured:
+    AsyncSession.run_sync in async mode, the threadpool in sync mode.
+    Functions get the Session as first argument and should return plain data
+    (or Pydantic models), not lazy-loading ORM objects.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        if get_database().is_async:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+async def get_db_runner():
+    database = get_database()
+    if database.is_async:
+        async with database.async_sessions() as session:
+            yield DBRunner(session)
+    else:
+        db = SessionLocal()
+        try:
+            yield DBRunner(db)
+        finally:
+            db.close()
+
+class ReadDBRunner(DBRunner):
+    """DBRunner on a replica (see ReplicaSet). If the replica fails, the read is retried on the primary"""
+
+    def __init__(self, replica):
+        super().__init__(replica.new_session() if replica else get_database().primary_session())
+        self.replica = replica
+
+    async def run(self, fn, *args, **kwargs):
+        try:
+            return await super().run(fn, *args, **kwargs)
+        except OperationalError:
+            if self.replica is None:
+                raise
+            get_database().replicas.mark_down(self.replica)
+            await self.close()
+            self.session, self.replica = get_database().primary_session(), None
+            return await super().run(fn, *args, **kwargs)
+
+    async def close(self):
+        if get_database().is_async:
+            await self.session.close()
+        else:
+            self.session.close()
+
+def sync_schema():
+    """
+    Create missing tables, then add columns/indexes wey new code expects on tables
+    wey already exist (create_all alone skips those). Safe to run on every boot.
+    """
+    import models  # noqa: F401 — make sure every table is registered on Base
+
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    from core.search import setup_search
+    setup_search(engine)  # Full-text index (Postgres GIN / SQLite FTS5)
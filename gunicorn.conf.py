@@ -0,0 +1,35 @@
+"""
+Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+One worker per CPU core by default (WEB_CONCURRENCY overrides). The schema migration
+runs once here in the master before any worker forks, unless RUN_MIGRATIONS=false
+because a release step already ran `python migrate.py`. Each worker then warms up
+(see core/warmup.py) before taking requests.
+Every worker has its own DB pool: keep WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+under the Postgres connection limit.
+"""
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(cores)))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30  # Finish in-flight requests on deploy/restart
+keepalive = 5
+
+# Each worker has its own password hashing pool — share the cores instead of each taking all
+os.environ.setdefault("HASH_WORKERS", str(max(1, cores // workers)))
+
+
+def on_starting(server):
+    run_migrations = os.getenv("RUN_MIGRATIONS", "true").lower() in ("1", "true", "yes")
+    # Set before the settings load: done once here, workers skip it
+    os.environ["RUN_MIGRATIONS"] = "false"
+    if run_migrations:
+        from migrate import migrate
+        migrate()
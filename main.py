@@ -1,40 +1,143 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
-from routes import auth, products, inventory, orders
-
-
-app = FastAPI(
-    title="MokoMarket Electronics MVP - Backend Live!",
-    description="Smart marketplace for electronics sellers with AI restock alerts",
-    version="1.0.0"
-)
-
-# Allow frontend to connect
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Change to your frontend URL later
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Fresh DB on every deploy (fix old schema error on Render)
-@app.on_event("startup")
-def on_startup():
-    #Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-
-# Include routes
-app.include_router(auth.router)
-app.include_router(products.router)
-app.include_router(inventory.router)
-app.include_router(orders.router)
-
-@app.get("/")
-def home():
-    return {
-        "message": "MokoMarket Electronics MVP Backend dey live! 🚀 Go /docs make you test am",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
\ No newline at end of file
+"""
+App entry point. create_app(settings) builds the FastAPI app; `main:app` is built on first access.
+
+    uvicorn main:app --reload
+    gunicorn -c gunicorn.conf.py main:app
+    create_app(Settings(database_url="sqlite:///test.db"))  # tests: no env vars, no SMTP
+
+Importing this module does nothing else: routers, the DB engine and the mail client are
+only built by create_app() / first use (check with `python benchmarks/import_time.py`).
+"""
+from typing import TYPE_CHECKING
+
+from settings import Settings, get_settings, use_settings
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+
+def create_app(settings: Settings = None) -> "FastAPI":
+    if settings is not None:
+        from database import reset_database
+        from core.mailer import reset_dispatcher
+        from core.events import reset_hub
+        from core.etags import reset_response_cache
+        from core.dependencies import reset_principal_cache
+        from core.otp import reset_store
+        from core.ratelimit import reset_backend
+
+        use_settings(settings)
+        reset_database()  # Engines and mail client get built from these settings on first use
+        reset_dispatcher()
+        reset_hub()  # Postgres hub listens on the old engine
+        # Caches and limits keyed by ids/ETags wey belong to the previous app's database
+        reset_response_cache()
+        reset_principal_cache()
+        reset_store()
+        reset_backend()
+    settings = get_settings()
+
+    # Imported here so `import main` stays cheap
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse
+    from database import sync_schema
+    from core import hashing
+    from core.mailer import get_dispatcher
+    from core.snapshots import refresher
+    from core.events import get_hub
+    from core import otp
+    from core.ratelimit import RateLimitMiddleware
+    from core import metrics
+    from core import warmup
+    from routes import auth, products, inventory, orders
+
+    app = FastAPI(
+        title="MokoMarket Electronics MVP - Backend Live!",
+        description="Smart marketplace for electronics sellers with AI restock alerts",
+        version="1.0.0"
+    )
+
+    # Per-IP limits on login/signup/OTP (added first so CORS still wraps the 429s)
+    app.add_middleware(RateLimitMiddleware)
+
+    # Allow frontend to connect
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(settings.cors_origins),  # CORS_ORIGINS=https://your-frontend (default *)
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],  # Pagination cursor + conditional GET for list endpoints
+    )
+
+    # Query count / DB time per route (outermost, so 429s and CORS preflights are counted too)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.on_event("startup")
+    def on_startup():
+        #Base.metadata.drop_all(bind=engine)
+        # Schema migration on boot. gunicorn.conf.py runs it once in the master instead and
+        # sets RUN_MIGRATIONS=false for the workers (or run `python migrate.py` as a release step)
+        if settings.run_migrations:
+            sync_schema()  # create_all + new columns/indexes on old tables
+
+    @app.on_event("startup")
+    async def start_background_workers():
+        get_dispatcher().start()  # Sends queued emails (OTP etc.)
+        refresher.start()  # Recomputes restock alerts after sales
+        await get_hub().start()  # Low-stock events (LISTEN connection on Postgres backend)
+        otp.start_sweeper()  # Deletes expired OTPs
+
+    @app.on_event("startup")
+    async def warm_up():
+        await warmup.warm_up(app)  # Last: pool connections, lazy schemas, hashing workers
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await get_dispatcher().stop()
+        await refresher.stop()
+        await get_hub().stop()
+        await otp.stop_sweeper()
+        hashing.shutdown()
+
+    # Include routes
+    app.include_router(auth.router)
+    app.include_router(products.router)
+    app.include_router(inventory.router)
+    app.include_router(orders.router)
+
+    @app.get("/health/live", include_in_schema=False)
+    def liveness():
+        return {"status": "ok"}
+
+    @app.get("/health/ready", include_in_schema=False)
+    async def readiness():
+        """Health check for deploys: 200 only once this worker is warm and the DB answers"""
+        if await warmup.is_ready(app):
+            return {"status": "ready"}
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def get_metrics():
+        """Prometheus scrape endpoint"""
+        return metrics.registry.render()
+
+    @app.get("/")
+    def home():
+        return {
+            "message": "MokoMarket Electronics MVP Backend dey live! 🚀 Go /docs make you test am",
+            "docs": "/docs",
+            "redoc": "/redoc"
+        }
+
+    return app
+
+
+def __getattr__(name):
+    # `main:app` (uvicorn, gunicorn, old imports) builds the app from env settings on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
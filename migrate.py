@@ -0,0 +1,22 @@
+"""
+Schema migration as its own step (create missing tables, columns and indexes).
+
+    python migrate.py
+
+Run it once per deploy (Render pre-deploy command) with RUN_MIGRATIONS=false on the
+web service, or let gunicorn.conf.py run it in the master before the workers start.
+"""
+import time
+
+
+def migrate():
+    from database import reset_database, sync_schema
+
+    started = time.perf_counter()
+    sync_schema()
+    reset_database()  # Forked workers must not inherit these connections
+    print(f"Schema up to date in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    migrate()
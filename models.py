@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean, Index, JSON, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -13,6 +13,9 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     is_verified = Column(Boolean, default=False)  # Auto-verified for MVP — no OTP needed
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bump to revoke old tokens
+    data_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped on every change the list ETags cover
+    rollups_built = Column(Boolean, default=False, server_default="0", nullable=False)  # Sales rollups cover all old orders
     created_at = Column(DateTime, default=func.now())
     
     products = relationship("Product", back_populates="seller")
@@ -22,6 +25,17 @@ class User(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_seller_id_id", "seller_id", "id"),  # Keyset pages for GET /products/
+        Index("uq_products_seller_sku", "seller_id", "sku", unique=True),  # Upsert key for catalogue import
+        # GET /inventory/low-stock: partial index holds only the rows wey need restock
+        # (plain index on databases without partial indexes)
+        Index(
+            "ix_products_low_stock", "seller_id", "quantity_in_stock", "id",
+            postgresql_where=text("quantity_in_stock <= reorder_point"),
+            sqlite_where=text("quantity_in_stock <= reorder_point"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -30,6 +44,9 @@ class Product(Base):
     quantity_in_stock = Column(Integer, nullable=False)
     category = Column(String, nullable=False)
     subcategory = Column(String, nullable=False)
+    sku = Column(String, nullable=True)  # Seller's own product code — unique per seller
+    reorder_point = Column(Integer, nullable=False, default=5, server_default="5")  # Low stock at or below this
+    reorder_quantity = Column(Integer, nullable=True)  # How many the seller usually buy per restock
     seller_id = Column(Integer, ForeignKey("users.id"))
     
     seller = relationship("User", back_populates="products")
@@ -47,6 +64,11 @@ class Order(Base):
     seller = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
+    # Keyset pages for GET /orders/ (newest first)
+    __table_args__ = (
+        Index("ix_orders_seller_created_id", seller_id, created_at.desc(), id.desc()),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     
@@ -59,14 +81,87 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
+# Client-supplied idempotency keys for POS batch sync (one key = one order, forever)
+class OrderKey(Base):
+    __tablename__ = "order_keys"
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+
+# Verification codes (core.otp). Replaces the old `otps` table, which stored plain
+# codes — that one is no longer read and fit be dropped.
 class OTP(Base):
-    __tablename__ = "otps"
+    __tablename__ = "otp_codes"
+    __table_args__ = (
+        Index("ix_otp_codes_user_expires", "user_id", "expires_at"),  # Live code lookup
+        Index("ix_otp_codes_expires_at", "expires_at"),  # Expired-row purge
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    code = Column(String(6), nullable=False)
+    code_hash = Column(String(64), nullable=False)  # HMAC-SHA256 hex, never the code itself
     expires_at = Column(DateTime, nullable=False)
     attempts = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime, default=func.now())
 
-    user = relationship("User", back_populates="otps")
\ No newline at end of file
+    user = relationship("User", back_populates="otps")
+
+# Sales rollups — kept up to date by record_sale so alerts no need scan all order_items
+class ProductSales(Base):
+    __tablename__ = "product_sales"
+    __table_args__ = (
+        Index("ix_product_sales_seller_revenue", "seller_id", "revenue"),
+    )
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units_sold = Column(Integer, nullable=False, default=0)
+
+class CategorySales(Base):
+    __tablename__ = "category_sales"
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units_sold = Column(Integer, nullable=False, default=0)
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+
+# Outgoing emails — written in the same transaction as the thing wey triggers them,
+# sent later by core.mailer's background dispatcher (survives restarts and SMTP downtime)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=func.now(), nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+# Precomputed /inventory/alerts/ payload per seller. Sales and product changes bump
+# dirty_version; core.snapshots' refresher recomputes and sets computed_version to match
+class AlertSnapshot(Base):
+    __tablename__ = "alert_snapshots"
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    payload = Column(JSON, nullable=True)
+    dirty_version = Column(Integer, nullable=False, default=0, server_default="0")
+    computed_version = Column(Integer, nullable=False, default=0, server_default="0")
+    computed_at = Column(DateTime, nullable=True)
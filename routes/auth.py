@@ -4,24 +4,30 @@ from datetime import timedelta
 import asyncio
 from pydantic import BaseModel
 
-from database import get_db
-from models import User
+from database import DBRunner, get_db, get_db_runner
+from models import User, OrderKey, AlertSnapshot, ProductSales, CategorySales, DailySales
 from schemas import UserCreate, UserLogin, Token, UserOut, UserUpdate
-from core.security import hash_password, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from core.otp import create_and_save_otp  # ← new import
-from core.email import conf, FastMail, MessageSchema  # ← new import for email
-from core.dependencies import get_current_user
+from core.security import create_access_token, user_token_claims, ACCESS_TOKEN_EXPIRE_MINUTES
+from core.hashing import hash_password_async, verify_and_update_async, hash_password_pooled
+from core.otp import OTP_TTL_MINUTES, create_and_save_otp, verify_otp
+from core.mailer import queue_email, get_dispatcher
+from core.dependencies import get_current_user, cache_user, forget_user
+from core.ratelimit import enforce_account, enforce_account_async
+from core.etags import bump_version
 
 router = APIRouter(prefix="/users", tags=["Users & Auth"])
 
-@router.post("/signup", response_model=Token)
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
+# Sync DB steps for the async signup/login, run via DBRunner so the event loop only
+# waits on the password hash (and the connection goes back to the pool during it)
+
+def _check_signup(db: Session, user: UserCreate):
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
     if user.phone and db.query(User).filter(User.phone == user.phone).first():
         raise HTTPException(status_code=400, detail="Phone already registered")
+    db.rollback()
 
-    hashed = hash_password(user.password)
+def _create_user(db: Session, user: UserCreate, hashed: str) -> dict:
     new_user = User(
         **user.dict(exclude={"password"}),
         password_hash=hashed,
@@ -30,30 +36,58 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    _queue_otp(db, new_user)
+    return user_token_claims(new_user)
+
+def _find_login(db: Session, email: str):
+    """(claims, password hash, verified) for the email, or None"""
+    db_user = db.query(User).filter(User.email == email).first()
+    if not db_user:
+        return None
+    found = user_token_claims(db_user), db_user.password_hash, db_user.is_verified
+    db.rollback()
+    return found
+
+def _upgrade_hash(db: Session, user_id: int, old_hash: str, new_hash: str):
+    # Only if the password no change while we were verifying
+    db.query(User).filter(User.id == user_id, User.password_hash == old_hash).update(
+        {User.password_hash: new_hash}, synchronize_session=False
+    )
+    db.commit()
 
-    otp = create_and_save_otp(db, new_user)
+@router.post("/signup", response_model=Token)
+async def signup(user: UserCreate, db: DBRunner = Depends(get_db_runner)):
+    await enforce_account_async("signup", user.email)  # Per-IP limit already ran in middleware
+    await db.run(_check_signup, user)
 
-    message = MessageSchema(
-        subject="MokoMarket - Your Verification Code",
-        recipients=[new_user.email],
-        body=f"Your OTP code is: {otp.code}\n\nThis code expires in 10 minutes. Enter it to verify your email.",
-        subtype="plain"
-    )
-    
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    hashed = await hash_password_async(user.password)  # Worker pool — no block the event loop
+    claims = await db.run(_create_user, user, hashed)
+    get_dispatcher().wake()
 
-    token = create_access_token(
-        {"sub": str(new_user.id)},
-        timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
+    token = create_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return {"access_token": token, "token_type": "bearer"}
 
+def _send_otp(db: Session, user: User):
+    _queue_otp(db, user)
+    get_dispatcher().wake()
+
+def _queue_otp(db: Session, user: User):
+    code = create_and_save_otp(db, user)
+
+    # Outbox row + background send — signup no wait for SMTP
+    queue_email(
+        db,
+        recipient=user.email,
+        subject="MokoMarket - Your Verification Code",
+        body=f"Your OTP code is: {code}\n\nThis code expires in {OTP_TTL_MINUTES} minutes. Enter it to verify your email.",
+    )
+    db.commit()
+
 class VerifyOTP(BaseModel):
     code: str
 
 @router.post("/verify-otp")
-def verify_otp(
+def verify_email(
     data: VerifyOTP,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -61,30 +95,54 @@ def verify_otp(
     if current_user.is_verified:
         return {"message": "Your email is already verified."}
 
+    enforce_account("verify-otp", current_user.id)
     if verify_otp(db, current_user.id, data.code):
         current_user.is_verified = True
         db.commit()
         db.refresh(current_user)
+        cache_user(current_user)
         return {"message": "Email verified successfully! You can now use full features."}
     else:
         raise HTTPException(
             status_code=400,
-            detail="Invalid or expired OTP. Please signup again if needed."
+            detail="Invalid or expired OTP. Use /users/resend-otp to get a new one."
         )
 
+@router.post("/resend-otp")
+def resend_otp(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if current_user.is_verified:
+        return {"message": "Your email is already verified."}
+
+    enforce_account("resend-otp", current_user.id)
+    _send_otp(db, current_user)  # Old code stops working
+    return {"message": "New OTP sent. Check your email."}
+
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: UserLogin, db: DBRunner = Depends(get_db_runner)):
+    await enforce_account_async("login", user.email)  # Before the DB and the password hash
+    found = await db.run(_find_login, user.email)
+    if not found:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+
+    claims, password_hash, is_verified = found
+    valid, new_hash = await verify_and_update_async(user.password, password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+
+    if new_hash:
+        # Stored hash used an old scheme/cost — upgrade am now wey we get the password
+        await db.run(_upgrade_hash, int(claims["sub"]), password_hash, new_hash)
     
-    if not db_user.is_verified:
+    if not is_verified:
         raise HTTPException(
             status_code=403,
-            detail="Email not verified. Check your inbox for OTP or signup again."
+            detail="Email not verified. Check your inbox for OTP or use /users/resend-otp."
         )
     
-    token = create_access_token({"sub": str(db_user.id)}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    token = create_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return {"access_token": token, "token_type": "bearer"}
 
 # Get My Profile
@@ -116,20 +174,31 @@ def update_profile(
     # Apply updates
     for key, value in update_dict.items():
         if key == "password" and value:
-            setattr(current_user, "password_hash", hash_password(value))
+            setattr(current_user, "password_hash", hash_password_pooled(value))
+            current_user.token_version += 1  # New password = old tokens stop working
         elif key != "password":
             setattr(current_user, key, value)
+    bump_version(db, current_user.id)
 
     db.commit()
     db.refresh(current_user)
+    cache_user(current_user)
     return current_user
 
+# Per-seller bookkeeping rows wey point at users.id. Products and orders stay (their
+# seller_id goes NULL, same as before); these go, else the FK blocks the delete
+_SELLER_ROWS = (OrderKey, AlertSnapshot, ProductSales, CategorySales, DailySales)
+
 # Delete My Account
 @router.delete("/me")
 def delete_account(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    user_id = current_user.id
+    for model in _SELLER_ROWS:
+        db.query(model).filter(model.seller_id == user_id).delete(synchronize_session=False)
     db.delete(current_user)
     db.commit()
+    forget_user(user_id)
     return {"message": "Account deleted successfully"}
\ No newline at end of file
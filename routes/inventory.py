@@ -1,80 +1,139 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from collections import defaultdict
+from typing import List, Optional
 
-from database import get_db
-from models import Product, Order, OrderItem, User
-from core.dependencies import get_current_user
+from database import DBRunner, get_db_runner
+from models import Product
+from schemas import ProductOut
+from core.dependencies import Principal, get_current_principal, get_read_db_runner
+from core.snapshots import read_alerts
+from core.forecast import WINDOWS, forecast
+from core.events import get_hub
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
+EVENTS_KEEPALIVE_SECONDS = 15  # Comment line so proxies no close an idle stream
+
 @router.get("/alerts/")
-def get_restock_alerts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_restock_alerts(
+    db: DBRunner = Depends(get_read_db_runner),
+    primary: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Precomputed snapshot — background worker refreshes it after sales/product changes
+    alerts = await db.run(read_alerts, current_user.id, compute_missing=False)
+    if alerts is None:
+        alerts = await primary.run(read_alerts, current_user.id)  # First visit: compute + store on the primary
+    return alerts
+
+async def _event_stream(seller_id: int):
+    async with get_hub().subscribe(seller_id) as queue:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@router.get("/events")
+async def stream_inventory_events(current_user: Principal = Depends(get_current_principal)):
+    """
+    Server-sent events: a `low_stock` event the moment a sale drops a product to the
+    low-stock threshold. Keep this one connection open instead of polling /alerts/.
+    """
+    return StreamingResponse(
+        _event_stream(current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _low_stock(db: Session, seller_id: int, limit: int, cursor: Optional[str]):
+    """Products at or below their reorder point, emptiest first — walks ix_products_low_stock"""
+    query = db.query(Product).filter(
+        Product.seller_id == seller_id,
+        Product.quantity_in_stock <= Product.reorder_point,
+    )
+
+    if cursor:
+        last_stock, last_id = decode_cursor(cursor, 2)
+        if not (last_stock.lstrip("-").isdigit() and last_id.isdigit()):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(Product.quantity_in_stock, Product.id) > tuple_(int(last_stock), int(last_id))
+        )
+
+    products = query.order_by(Product.quantity_in_stock, Product.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1].quantity_in_stock, products[-1].id)
+
+    return [ProductOut.model_validate(product) for product in products], next_cursor
+
+@router.get("/low-stock", response_model=List[ProductOut])
+async def get_low_stock(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Every product wey need restock (stock at or below its reorder_point), one page at a time"""
+    products, next_cursor = await db.run(_low_stock, current_user.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return products
+
+@router.get("/forecast")
+async def get_restock_forecast(
+    alpha: float = Query(0.3, gt=0, le=1),  # Smoothing: higher = react faster to recent days
+    horizon_days: int = Query(30, ge=1, le=365),  # How many days of stock you wan buy for
+    lead_time_days: int = Query(7, ge=0, le=180),  # How long restock take to arrive
+    restock_only: bool = False,
+    limit: int = Query(100, ge=1, le=5000),
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    orders = db.query(Order).filter(Order.seller_id == current_user.id).all()
-    
-    if not orders:
-        return {"message": "No sales yet — start recording sales to get smart restock alerts!"}
-    
-    # Track sales per product (not just category)
-    product_sales = defaultdict(float)       # product_id -> total revenue
-    category_sales = defaultdict(float)      # category -> total revenue
-    total_revenue = 0.0
-    
-    for order in orders:
-        for item in order.items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                revenue = item.quantity * item.price_at_purchase
-                product_sales[item.product_id] += revenue
-                category_sales[product.category] += revenue
-                total_revenue += revenue
-    
-    if total_revenue == 0:
-        return {"message": "No revenue recorded yet — keep selling!"}
-    
-    # Find top category
-    top_category = max(category_sales, key=category_sales.get)
-    category_percentage = (category_sales[top_category] / total_revenue) * 100
-    
-    # Find top-selling products in the top category
-    top_products = []
-    for prod_id, revenue in sorted(product_sales.items(), key=lambda x: x[1], reverse=True):
-        product = db.query(Product).filter(Product.id == prod_id).first()
-        if product and product.category == top_category:
-            top_products.append({
-                "name": product.name,
-                "revenue": round(revenue, 2),
-                "stock_left": product.quantity_in_stock,
-                "low_stock": product.quantity_in_stock <= 5  # You fit change threshold to 10 or whatever
-            })
-        if len(top_products) >= 3:  # Limit to top 3 products
-            break
-    
-    # Build message
-    message = f"{top_category} dey hot pass! 🔥 E carry {category_percentage:.1f}% of your total sales ({round(total_revenue, 2):,} NGN).\n\n"
-    
-    if top_products:
-        message += "Top sellers for restock:\n"
-        for p in top_products:
-            message += f"- {p['name']}: {p['revenue']:,} NGN sold\n"
-            if p['low_stock']:
-                message += "   ⚠️ STOCK DEY LOW O! Buy more sharp sharp!\n"
-            else:
-                message += "   Stock still okay.\n"
-    
-    # Extra low stock alert if any hot product dey low
-    low_stock_products = [p['name'] for p in top_products if p['low_stock']]
-    if low_stock_products:
-        message += "\nURGENT: " + ", ".join(low_stock_products) + " dey finish fast — restock NOW before customers vex! ⏰"
-    
+    """
+    Days of cover for every product from its recent sales speed, most urgent first.
+    needs_restock = stock go finish before a new delivery fit arrive.
+    """
+    products = await db.run(
+        forecast, current_user.id,
+        alpha=alpha, horizon_days=horizon_days, lead_time_days=lead_time_days,
+    )
+    if restock_only:
+        products = [p for p in products if p["needs_restock"]]
+
     return {
-        "top_category": top_category,
-        "category_percentage": round(category_percentage, 1),
-        "total_revenue": round(total_revenue, 2),
-        "top_products": top_products,  # For frontend later
-        "message": message,
-        "category_breakdown": dict(category_sales)
-    }
\ No newline at end of file
+        "horizon_days": horizon_days,
+        "lead_time_days": lead_time_days,
+        "restock_count": sum(1 for p in products if p["needs_restock"]),
+        "products": products[:limit],
+    }
+
+@router.get("/velocity")
+async def get_sales_velocity(
+    window: int = Query(30),
+    limit: int = Query(20, ge=1, le=5000),
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Fastest-moving products: units sold per day over the last 7, 30 or 90 days"""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(map(str, WINDOWS))}")
+
+    products = await db.run(forecast, current_user.id)
+    products.sort(key=lambda p: p["velocity"][f"{window}d"], reverse=True)
+    return [
+        {key: p[key] for key in ("product_id", "name", "category", "stock_left", "velocity")}
+        for p in products[:limit]
+    ]
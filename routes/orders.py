@@ -1,45 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy import insert, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta, timezone
+import csv
+import io
+import json
 
-from database import get_db
-from models import Order, OrderItem, Product, User
-from schemas import OrderCreate, OrderOut
-from core.dependencies import get_current_user
+from database import DBRunner, get_db_runner, read_session
+from models import Order, OrderItem, OrderKey
+from schemas import OrderCreate, OrderOut, OrderItemOut, BulkOrderCreate, BulkOrderResult
+from core.dependencies import Principal, get_current_principal, get_read_db_runner
+from core.rollups import add_order_to_rollups, add_orders_to_rollups
+from core.snapshots import mark_dirty, refresher
+from core.events import crossed_low_stock, get_hub
+from core.etags import bump_version, conditional_list
+from core import fastjson
+from core.stock import lock_products, decrement_stock
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-@router.post("/", response_model=OrderOut, status_code=status.HTTP_201_CREATED)
-def record_sale(
-    order_data: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+_order_list = TypeAdapter(List[OrderOut])
+_order_columns = fastjson.columns_for(Order, OrderOut, exclude=("items",))
+_item_columns = fastjson.columns_for(OrderItem, OrderItemOut)
+
+def _record_sale(db: Session, order_data: OrderCreate, seller_id: int):
+    """Record one order. Returns (order, low-stock events to publish after commit)"""
     if not order_data.items:
         raise HTTPException(status_code=400, detail="Order must have at least one item")
 
+    # Same product fit appear twice in one basket — check stock against the total
+    quantities = {}
+    for item in order_data.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # One query for all products, rows locked until commit so concurrent sales queue up
+    products = lock_products(db, seller_id, quantities.keys())
+
     total_amount = 0.0
     order_items_to_create = []
 
     # Validate products and calculate total + prepare items
     for item in order_data.items:
-        product = db.query(Product).filter(
-            Product.id == item.product_id,
-            Product.seller_id == current_user.id
-        ).first()
+        product = products.get(item.product_id)
 
         if not product:
             raise HTTPException(status_code=404, detail=f"Product with id {item.product_id} not found")
 
-        if product.quantity_in_stock < item.quantity:
+        if product.quantity_in_stock < quantities[item.product_id]:
             raise HTTPException(
                 status_code=400,
                 detail=f"Not enough stock for {product.name}. Available: {product.quantity_in_stock}"
             )
 
-        # Reduce stock
-        product.quantity_in_stock -= item.quantity
-
         # Calculate amount for this item
         item_total = item.quantity * item.price_at_purchase
         total_amount += item_total
@@ -53,11 +70,18 @@ def record_sale(
             )
         )
 
+    # Reduce stock in one atomic UPDATE (the WHERE guard stops overselling even without row locks)
+    if not decrement_stock(db, quantities):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Stock changed while recording this sale. Please try again.")
+    events = crossed_low_stock(products, quantities)  # products still hold the pre-sale stock
+
     # Create the Order
     new_order = Order(
-        seller_id=current_user.id,
+        seller_id=seller_id,
         total_amount=total_amount,
-        status="completed"
+        status="completed",
+        created_at=datetime.utcnow()  # Set here so the rollup day matches the order
     )
     db.add(new_order)
     db.flush()  # Get the order.id without committing yet
@@ -67,27 +91,332 @@ def record_sale(
         order_item.order_id = new_order.id
 
     db.add_all(order_items_to_create)
+
+    # Update sales rollups in the same transaction as the order
+    add_order_to_rollups(db, seller_id, new_order.created_at.date(), order_items_to_create, products)
+    mark_dirty(db, seller_id)  # Restock alerts need a recompute
+    bump_version(db, seller_id)  # Order + product lists changed
     db.commit()
     db.refresh(new_order)
 
-    return new_order
+    return OrderOut.model_validate(new_order), events
+
+@router.post("/", response_model=OrderOut, status_code=status.HTTP_201_CREATED)
+async def record_sale(
+    order_data: OrderCreate,
+    db: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    order, events = await db.run(_record_sale, order_data, current_user.id)
+    refresher.wake()
+    await get_hub().publish(current_user.id, events)
+    return order
+
+MAX_BULK_ORDERS = 1000  # Per request — POS devices split bigger backlogs
+MAX_OFFLINE_DAYS = 30  # Oldest sale time we accept from a device
+
+def _sale_time(created_at: Optional[datetime], now: datetime) -> datetime:
+    """Device sale time as naive UTC, kept between MAX_OFFLINE_DAYS ago and now (device clocks lie)"""
+    if created_at is None:
+        return now
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(max(created_at, now - timedelta(days=MAX_OFFLINE_DAYS)), now)
+
+def _record_sales_bulk(db: Session, payload: BulkOrderCreate, seller_id: int):
+    """Record a batch of orders. Returns (per-order results, low-stock events)"""
+    entries = payload.orders
+    if len(entries) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Send at most {MAX_BULK_ORDERS} orders per batch")
+
+    # Keys wey we don already record before
+    keys = {entry.idempotency_key for entry in entries}
+    existing = dict(
+        db.query(OrderKey.key, OrderKey.order_id)
+        .filter(OrderKey.seller_id == seller_id, OrderKey.key.in_(keys))
+        .all()
+    ) if keys else {}
+
+    # All products for the whole batch in one locked query
+    products = lock_products(
+        db, seller_id, {item.product_id for entry in entries for item in entry.items}
+    )
+    stock_left = {product_id: product.quantity_in_stock for product_id, product in products.items()}
+
+    results = []
+    events = []
+    accepted = []  # (result index, entry)
+    quantities = {}
+    seen_keys = set()
+
+    for entry in entries:
+        result = BulkOrderResult(idempotency_key=entry.idempotency_key, status="rejected")
+        results.append(result)
+
+        if entry.idempotency_key in existing or entry.idempotency_key in seen_keys:
+            result.status = "duplicate"
+            result.order_id = existing.get(entry.idempotency_key)  # Filled below for keys in this batch
+            continue
+
+        if not entry.items:
+            result.detail = "Order must have at least one item"
+            continue
+
+        wanted = {}
+        for item in entry.items:
+            wanted[item.product_id] = wanted.get(item.product_id, 0) + item.quantity
+
+        missing = [product_id for product_id in wanted if product_id not in products]
+        if missing:
+            result.detail = f"Product with id {missing[0]} not found"
+            continue
+
+        short = [product_id for product_id, qty in wanted.items() if stock_left[product_id] < qty]
+        if short:
+            product = products[short[0]]
+            result.detail = f"Not enough stock for {product.name}. Available: {stock_left[product.id]}"
+            continue
+
+        # Earlier orders in the batch use stock first, same as if dem came one by one
+        for product_id, qty in wanted.items():
+            stock_left[product_id] -= qty
+            quantities[product_id] = quantities.get(product_id, 0) + qty
+        accepted.append((len(results) - 1, entry))
+        seen_keys.add(entry.idempotency_key)
+
+    if accepted:
+        if not decrement_stock(db, quantities):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Stock changed while recording this batch. Please try again.")
+        events = crossed_low_stock(products, quantities, stock_left)
+
+        # Offline sales keep the time they happened, so rollups/forecasts see the right day
+        now = datetime.utcnow()
+        sold_at = [_sale_time(entry.created_at, now) for _, entry in accepted]
+        order_ids = db.scalars(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            [
+                {
+                    "seller_id": seller_id,
+                    "total_amount": sum(item.quantity * item.price_at_purchase for item in entry.items),
+                    "status": "completed",
+                    "created_at": created_at,
+                }
+                for created_at, (_, entry) in zip(sold_at, accepted)
+            ],
+        ).all()
+
+        # executemany inserts — batched into multi-row VALUES by SQLAlchemy
+        order_items = [
+            {
+                "order_id": order_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "price_at_purchase": item.price_at_purchase,
+            }
+            for order_id, (_, entry) in zip(order_ids, accepted)
+            for item in entry.items
+        ]
+        db.execute(insert(OrderItem), order_items)
+
+        try:
+            # The key insert fails right here (not at commit) if another sync just recorded it
+            db.execute(insert(OrderKey), [
+                {"seller_id": seller_id, "key": entry.idempotency_key, "order_id": order_id}
+                for order_id, (_, entry) in zip(order_ids, accepted)
+            ])
+
+            add_orders_to_rollups(
+                db, seller_id,
+                [(created_at.date(), entry.items) for created_at, (_, entry) in zip(sold_at, accepted)],
+                products,
+            )
+            mark_dirty(db, seller_id)
+            bump_version(db, seller_id)
+            db.commit()
+        except IntegrityError:
+            # Another sync with the same keys won the race — client fit just retry
+            db.rollback()
+            raise HTTPException(status_code=409, detail="This batch is already being recorded. Please try again.")
+
+        created = {}
+        for order_id, (index, entry) in zip(order_ids, accepted):
+            results[index].status = "created"
+            results[index].order_id = order_id
+            created[entry.idempotency_key] = order_id
+        for result in results:
+            if result.status == "duplicate" and result.order_id is None:
+                result.order_id = created.get(result.idempotency_key)
+
+    return results, events
+
+@router.post("/bulk", response_model=List[BulkOrderResult])
+async def record_sales_bulk(
+    payload: BulkOrderCreate,
+    db: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Record many sales at once (POS offline sync). Each order carries an idempotency_key,
+    so re-sending a batch after a timeout no go double-record anything. Orders wey fail
+    validation are rejected one by one; the rest go in together in one transaction.
+    Send each order's created_at (when the device made the sale) so offline sales land
+    on the right day; it is kept within the last MAX_OFFLINE_DAYS and never in the future.
+    """
+    results, events = await db.run(_record_sales_bulk, payload, current_user.id)
+    refresher.wake()
+    await get_hub().publish(current_user.id, events)
+    return results
+
+def _get_my_orders(db: Session, seller_id: int, limit: int, cursor: Optional[str], fast: bool = False):
+    """
+    One page of the seller's orders (newest first) plus the next cursor (or None).
+    fast=True: only the OrderOut columns, as plain dicts (for fastjson.dumps)
+    """
+    if fast:
+        query = db.query(*_order_columns)
+    else:
+        query = db.query(Order).options(selectinload(Order.items))  # All items for the page in one extra query
+    query = query.filter(Order.seller_id == seller_id)
+
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(created_at), int(order_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(Order.created_at, Order.id) < after)
+
+    # Fetch one extra row to know if another page dey
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+
+    if fast:
+        # Items for the whole page in one query, same as selectinload but as tuples
+        items = {order.id: [] for order in orders}
+        if items:
+            for row in (
+                db.query(OrderItem.order_id, *_item_columns)
+                .filter(OrderItem.order_id.in_(items))
+                .order_by(OrderItem.order_id, OrderItem.id)
+            ):
+                items[row.order_id].append(dict(zip(OrderItemOut.model_fields, row[1:])))
+        return [{**order._asdict(), "items": items[order.id]} for order in orders], next_cursor
+
+    return [OrderOut.model_validate(order) for order in orders], next_cursor
 
 @router.get("/", response_model=List[OrderOut])
-def get_my_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_my_orders(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Get list of all your recorded sales/orders, newest first
+    Get your recorded sales/orders, newest first, one page at a time.
+    If more dey, the X-Next-Cursor response header carries the cursor for the next page.
+    Send back the ETag in If-None-Match to get a 304 when nothing changed.
     """
-    orders = (
-        db.query(Order)
-        .filter(Order.seller_id == current_user.id)
-        .order_by(Order.created_at.desc())
-        .all()
+    return await conditional_list(
+        request, db, current_user.id, "orders", (limit, cursor),
+        lambda session: _get_my_orders(session, current_user.id, limit, cursor, fast=fastjson.FAST_JSON),
+        fastjson.dumps if fastjson.FAST_JSON else _order_list.dump_json,
+    )
+
+EXPORT_BATCH_ROWS = 1000  # Rows per DB fetch and per chunk written to the client
+CSV_COLUMNS = ["order_id", "created_at", "status", "total_amount", "product_id", "quantity", "price_at_purchase"]
+
+def _export_rows(seller_id: int, start: Optional[date], end: Optional[date]):
+    """Yield (order, item) row tuples oldest first, streamed from a server-side cursor"""
+    # Own session: the request's get_db session don close before streaming starts.
+    # Replica when configured — a full-history export is the heaviest read we get
+    db = read_session(seller_id)
+    try:
+        query = (
+            db.query(
+                Order.id, Order.created_at, Order.status, Order.total_amount,
+                OrderItem.product_id, OrderItem.quantity, OrderItem.price_at_purchase,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .filter(Order.seller_id == seller_id)
+        )
+        if start:
+            query = query.filter(Order.created_at >= datetime.combine(start, time.min))
+        if end:
+            query = query.filter(Order.created_at < datetime.combine(end + timedelta(days=1), time.min))
+
+        yield from (
+            query.order_by(Order.created_at, Order.id, OrderItem.id)
+            .yield_per(EXPORT_BATCH_ROWS)  # Server-side cursor (stream_results), never .all()
+        )
+    finally:
+        db.close()
+
+def _export_ndjson(rows):
+    """One JSON line per order, with its items"""
+    chunk = []
+    current = None
+    for order_id, created_at, order_status, total_amount, product_id, quantity, price in rows:
+        if current is None or current["id"] != order_id:
+            if current is not None:
+                chunk.append(json.dumps(current) + "\n")
+                if len(chunk) >= EXPORT_BATCH_ROWS:
+                    yield "".join(chunk)
+                    chunk = []
+            current = {
+                "id": order_id,
+                "created_at": created_at.isoformat() if created_at else None,
+                "status": order_status,
+                "total_amount": total_amount,
+                "items": [],
+            }
+        if product_id is not None:
+            current["items"].append({"product_id": product_id, "quantity": quantity, "price_at_purchase": price})
+
+    if current is not None:
+        chunk.append(json.dumps(current) + "\n")
+    if chunk:
+        yield "".join(chunk)
+
+def _export_csv(rows):
+    """One CSV line per order item (orders without items get one line with empty item columns)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for count, (order_id, created_at, *rest) in enumerate(rows, start=1):
+        writer.writerow([order_id, created_at.isoformat() if created_at else "", *rest])
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@router.get("/export")
+def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Download your full sales history (optionally between start and end dates, inclusive)
+    as NDJSON (one order per line) or CSV (one item per line). Streams — no page limit.
+    """
+    rows = _export_rows(current_user.id, start, end)
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="orders.csv"'},
+        )
+    return StreamingResponse(
+        _export_ndjson(rows),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="orders.ndjson"'},
     )
-    
-    if not orders:
-        return []  # or raise 404 if you prefer, but empty list is fine for MVP
-    
-    return orders
\ No newline at end of file
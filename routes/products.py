@@ -1,41 +1,212 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from database import get_db
-from models import Product, User
-from schemas import ProductCreate, ProductOut
-from core.dependencies import get_current_user
+from database import DBRunner, get_db_runner
+from models import Product
+from schemas import ProductCreate, ProductUpdate, ProductOut, ProductSearchOut, ProductImportResult, ProductImportError
+from core.dependencies import Principal, get_current_principal, get_read_db_runner
+from core.search import search_products
+from core.snapshots import mark_dirty, refresher
+from core.etags import bump_version, conditional_list
+from core import fastjson
+from core.product_import import IMPORT_CHUNK_ROWS, MAX_REPORTED_ERRORS, iter_records, validate_record, upsert_products
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+_product_list = TypeAdapter(List[ProductOut])
+_product_columns = fastjson.columns_for(Product, ProductOut)
 
-@router.post("/", response_model=ProductOut)
-def create_product(
-    product: ProductCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+
+def _create_product(db: Session, product: ProductCreate, seller_id: int) -> ProductOut:
     db_product = Product(
-        **product.dict(),
-        seller_id=current_user.id
+        **product.dict(exclude_none=True),  # Unset reorder_point falls back to the column default
+        seller_id=seller_id
     )
 
     db.add(db_product)
-    db.commit()
+    bump_version(db, seller_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"You already get a product with sku {product.sku}")
     db.refresh(db_product)
 
-    return db_product
+    return ProductOut.model_validate(db_product)
+
+
+@router.post("/", response_model=ProductOut)
+async def create_product(
+    product: ProductCreate,
+    db: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    return await db.run(_create_product, product, current_user.id)
+
+
+# Columns wey no fit be NULL — sending null for them is a client mistake
+_NOT_NULL_FIELDS = {"name", "description", "price", "quantity_in_stock", "category", "subcategory", "reorder_point"}
+
+
+def _update_product(db: Session, product_id: int, changes: ProductUpdate, seller_id: int) -> ProductOut:
+    product = db.query(Product).filter(Product.id == product_id, Product.seller_id == seller_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    fields = changes.dict(exclude_unset=True)
+    for name, value in fields.items():
+        if value is None and name in _NOT_NULL_FIELDS:
+            raise HTTPException(status_code=400, detail=f"{name} cannot be null")
+        setattr(product, name, value)
+
+    mark_dirty(db, seller_id)  # Stock, name or reorder point fit change the restock alerts
+    bump_version(db, seller_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"You already get a product with sku {changes.sku}")
+    db.refresh(product)
+
+    return ProductOut.model_validate(product)
+
+
+@router.patch("/{product_id}", response_model=ProductOut)
+async def update_product(
+    product_id: int,
+    changes: ProductUpdate,
+    db: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Change some fields of your product, e.g. {"reorder_point": 10, "reorder_quantity": 50}"""
+    product = await db.run(_update_product, product_id, changes, current_user.id)
+    refresher.wake()
+    return product
+
+
+def _list_products(db: Session, seller_id: int, limit: int, cursor: Optional[str], fast: bool = False):
+    """
+    One page of the seller's products by id, plus the next cursor (or None).
+    fast=True: only the ProductOut columns, as plain dicts (for fastjson.dumps)
+    """
+    query = db.query(*_product_columns) if fast else db.query(Product)
+    query = query.filter(Product.seller_id == seller_id)
+
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not last_id.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(Product.id > int(last_id))
+
+    products = query.order_by(Product.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1].id)
+
+    if fast:
+        return [row._asdict() for row in products], next_cursor
+    return [ProductOut.model_validate(product) for product in products], next_cursor
 
 
 @router.get("/", response_model=List[ProductOut])
-def list_products(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def list_products(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Only return products belonging to logged-in seller, one page at a time (by id).
+    # Send back the ETag in If-None-Match to get a 304 when nothing changed.
+    return await conditional_list(
+        request, db, current_user.id, "products", (limit, cursor),
+        lambda session: _list_products(session, current_user.id, limit, cursor, fast=fastjson.FAST_JSON),
+        fastjson.dumps if fastjson.FAST_JSON else _product_list.dump_json,
+    )
+
+
+def _search_my_products(db: Session, seller_id: int, **filters) -> ProductSearchOut:
+    found = search_products(db, seller_id, **filters)
+    return ProductSearchOut(
+        total=found["total"],
+        results=[ProductOut.model_validate(product) for product in found["results"]],
+        facets=found["facets"],
+    )
+
+
+@router.get("/search", response_model=ProductSearchOut)
+async def search_my_products(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=10000),
+    db: DBRunner = Depends(get_read_db_runner),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Only return products belonging to logged-in seller
-    return (
-        db.query(Product)
-        .filter(Product.seller_id == current_user.id)
-        .all()
+    """
+    Search your catalogue by name/description/category/subcategory words (prefix match),
+    filter by price and stock, and get category/subcategory counts for the matches.
+    """
+    return await db.run(
+        _search_my_products, current_user.id,
+        q=q, category=category, subcategory=subcategory,
+        min_price=min_price, max_price=max_price, in_stock=in_stock,
+        limit=limit, offset=offset,
     )
+
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: DBRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Upload your catalogue as the raw request body — CSV with a header row
+    (name, description, price, quantity_in_stock, category, subcategory, sku,
+    optional reorder_point, reorder_quantity) or NDJSON, one product per line.
+    Rows with an existing sku update that product.
+    Format comes from ?format= or the Content-Type (text/csv, application/x-ndjson).
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "json" in content_type else "csv"
+
+    processed = upserted = error_count = 0
+    errors = []
+    chunk = []
+
+    def add_error(row, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(ProductImportError(row=row, error=message))
+
+    async for row, record in iter_records(request.stream(), format):
+        processed += 1
+        product = validate_record(record) if isinstance(record, dict) else record
+        if isinstance(product, str):
+            add_error(row, product)
+            continue
+        chunk.append(product)
+        if len(chunk) >= IMPORT_CHUNK_ROWS:
+            upserted += await db.run(upsert_products, current_user.id, chunk)
+            chunk = []
+
+    if chunk:
+        upserted += await db.run(upsert_products, current_user.id, chunk)
+    if upserted:
+        refresher.wake()
+
+    return ProductImportResult(processed=processed, upserted=upserted, error_count=error_count, errors=errors)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # User schemas (already there)
@@ -44,6 +44,21 @@ class ProductCreate(BaseModel):
     quantity_in_stock: int
     category: str
     subcategory: str
+    sku: Optional[str] = None
+    reorder_point: Optional[int] = Field(None, ge=0)  # Default 5
+    reorder_quantity: Optional[int] = Field(None, ge=1)
+
+class ProductUpdate(BaseModel):
+    # Only the fields you send get changed
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity_in_stock: Optional[int] = Field(None, ge=0)
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    sku: Optional[str] = None
+    reorder_point: Optional[int] = Field(None, ge=0)
+    reorder_quantity: Optional[int] = Field(None, ge=1)
 
 class ProductOut(BaseModel):
     id: int
@@ -53,11 +68,33 @@ class ProductOut(BaseModel):
     quantity_in_stock: int
     category: str
     subcategory: str
+    sku: Optional[str] = None
+    reorder_point: int
+    reorder_quantity: Optional[int] = None
     seller_id: int
 
     class Config:
         from_attributes = True
 
+class ProductImportError(BaseModel):
+    row: int  # Line number in the uploaded file (CSV header = row 1)
+    error: str
+
+class ProductImportResult(BaseModel):
+    processed: int
+    upserted: int
+    error_count: int
+    errors: List[ProductImportError]  # First few only — see error_count for the total
+
+class ProductFacets(BaseModel):
+    category: Dict[str, int]  # category -> number of matching products
+    subcategory: Dict[str, int]
+
+class ProductSearchOut(BaseModel):
+    total: int
+    results: List[ProductOut]
+    facets: ProductFacets
+
 # Order schemas
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -85,3 +122,17 @@ class OrderOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Bulk order sync (POS devices wey go offline)
+class BulkOrderEntry(OrderCreate):
+    idempotency_key: str  # Same key sent twice = same sale, only recorded once
+    created_at: Optional[datetime] = None  # When the sale happened on the device (default: sync time)
+
+class BulkOrderCreate(BaseModel):
+    orders: List[BulkOrderEntry]
+
+class BulkOrderResult(BaseModel):
+    idempotency_key: str
+    status: str  # "created", "duplicate" or "rejected"
+    order_id: Optional[int] = None
+    detail: Optional[str] = None
@@ -0,0 +1,99 @@
+"""
+App settings: the environment (plus .env) read once into one typed object.
+
+    create_app()                                            # from env, like before
+    create_app(Settings(database_url="sqlite:///test.db"))  # tests: no env vars, no SMTP
+
+Only what builds connections lives here (database, mail, app wiring). Tuning knobs
+for single modules (HASH_*, RATE_LIMIT_*, OTP_* ...) stay next to the code wey uses them.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("true", "1", "yes")
+
+
+def _list(name: str) -> Tuple[str, ...]:
+    return tuple(item.strip() for item in os.getenv(name, "").split(",") if item.strip())
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str = ""
+    database_async_url: str = ""  # Overrides the async URL built from database_url
+    db_async: bool = False  # Product/order/inventory routes on an async engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800  # Seconds — before Render/PG drop idle conns
+    db_pool_pre_ping: bool = True
+    replica_urls: Tuple[str, ...] = ()
+    replica_retry_seconds: float = 30  # How long a failed replica sits out
+    replica_sticky_seconds: float = 5  # Reads after a write stay on the primary
+
+    run_migrations: bool = True  # sync_schema() on startup
+
+    mail_server: Optional[str] = None
+    mail_port: int = 587
+    mail_username: Optional[str] = None
+    mail_password: Optional[str] = field(default=None, repr=False)
+    mail_from: Optional[str] = None
+    mail_starttls: bool = True
+    mail_ssl_tls: bool = False
+    use_credentials: bool = True
+    validate_certs: bool = True
+    mail_timeout: int = 60
+
+    cors_origins: Tuple[str, ...] = ("*",)
+
+    otp_pepper: str = field(default="", repr=False)  # HMAC key for stored OTPs; same on every worker
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL", ""),
+            database_async_url=os.getenv("DATABASE_ASYNC_URL", ""),
+            db_async=_flag("DB_ASYNC", "False"),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            db_pool_pre_ping=_flag("DB_POOL_PRE_PING", "True"),
+            replica_urls=_list("DATABASE_REPLICA_URLS"),
+            replica_retry_seconds=float(os.getenv("REPLICA_RETRY_SECONDS", "30")),
+            replica_sticky_seconds=float(os.getenv("REPLICA_STICKY_SECONDS", "5")),
+            run_migrations=_flag("RUN_MIGRATIONS", "true"),
+            mail_server=os.getenv("MAIL_SERVER"),
+            mail_port=int(os.getenv("MAIL_PORT", "587")),
+            mail_username=os.getenv("MAIL_USERNAME"),
+            mail_password=os.getenv("MAIL_PASSWORD"),
+            mail_from=os.getenv("MAIL_FROM"),
+            mail_starttls=_flag("MAIL_STARTTLS", "True"),
+            mail_ssl_tls=_flag("MAIL_SSL_TLS", "False"),
+            use_credentials=_flag("USE_CREDENTIALS", "True"),
+            validate_certs=_flag("VALIDATE_CERTS", "True"),
+            mail_timeout=int(os.getenv("MAIL_TIMEOUT", "60")),
+            cors_origins=_list("CORS_ORIGINS") or ("*",),
+            otp_pepper=os.getenv("OTP_PEPPER", ""),
+        )
+
+
+_settings = None
+
+
+def get_settings() -> Settings:
+    """The settings in use: whatever create_app() got, else loaded from env/.env once"""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _settings = Settings.from_env()
+    return _settings
+
+
+def use_settings(settings: Settings):
+    global _settings
+    _settings = settings
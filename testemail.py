@@ -1,5 +1,5 @@
 import asyncio
-from core.email import conf, FastMail, MessageSchema
+from core.email import get_conf, FastMail, MessageSchema
 
 async def test_send():
     message = MessageSchema(
@@ -11,7 +11,7 @@ async def test_send():
     
     print("Sending to:", message.recipients)  # extra debug
     
-    fm = FastMail(conf)
+    fm = FastMail(get_conf())
     await fm.send_message(message)
     print("Email sent successfully!")
 
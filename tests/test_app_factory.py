@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from settings import Settings
+from core.security import create_access_token
+
+PRODUCT = dict(description="d", price=100, quantity_in_stock=10, category="phones", subcategory="s")
+
+
+def _add_seller() -> dict:
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    user = User(business_name="shop", location="Lagos", email="seller@example.com", password_hash="x", is_verified=True)
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id), "ver": 0}, timedelta(minutes=5))
+    db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _app(tmp_path, name: str):
+    return main.create_app(Settings(database_url=f"sqlite:///{tmp_path / name}.db"))
+
+
+def test_second_app_does_not_see_first_apps_data(tmp_path):
+    with TestClient(_app(tmp_path, "a")) as client:
+        headers_a = _add_seller()
+        client.post("/products/", json={"name": "from a", **PRODUCT}, headers=headers_a)
+        assert [p["name"] for p in client.get("/products/", headers=headers_a).json()] == ["from a"]
+
+    with TestClient(_app(tmp_path, "b")) as client:
+        # Same user id, but this database has no such user yet
+        assert client.get("/products/", headers=headers_a).status_code == 401
+
+        headers_b = _add_seller()
+        client.post("/products/", json={"name": "from b", **PRODUCT}, headers=headers_b)
+        assert [p["name"] for p in client.get("/products/", headers=headers_b).json()] == ["from b"]
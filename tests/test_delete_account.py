@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from settings import Settings
+from core.security import create_access_token
+
+
+def _enforce_foreign_keys(engine):
+    # Postgres always checks them; SQLite only with this pragma
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+def test_seller_with_sales_can_delete_account(tmp_path):
+    from database import SessionLocal, get_engine
+    from models import User, Order, DailySales
+
+    app = main.create_app(Settings(database_url=f"sqlite:///{tmp_path / 'shop'}.db"))
+    _enforce_foreign_keys(get_engine())
+
+    with TestClient(app) as client:
+        db = SessionLocal()
+        user = User(business_name="shop", location="Lagos", email="seller@example.com", password_hash="x", is_verified=True)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        token = create_access_token({"sub": str(user_id), "ver": 0}, timedelta(minutes=5))
+        headers = {"Authorization": f"Bearer {token}"}
+
+        product = client.post("/products/", json=dict(
+            name="Phone", description="d", price=100, quantity_in_stock=10, category="phones", subcategory="s"
+        ), headers=headers).json()
+        item = {"product_id": product["id"], "quantity": 1, "price_at_purchase": 100}
+        assert client.post("/orders/", json={"items": [item]}, headers=headers).status_code == 201
+        sync = client.post("/orders/bulk", json={"orders": [{"idempotency_key": "pos-1", "items": [item]}]}, headers=headers)
+        assert sync.status_code == 200
+        assert db.query(DailySales).filter(DailySales.seller_id == user_id).count() == 1
+
+        assert client.delete("/users/me", headers=headers).status_code == 200
+        db.expire_all()
+        assert db.get(User, user_id) is None
+        assert db.query(DailySales).filter(DailySales.seller_id == user_id).count() == 0
+        assert db.query(Order).filter(Order.seller_id.is_(None)).count() == 2  # Sales history stays
+        db.close()
@@ -0,0 +1,36 @@
+import asyncio
+
+from schemas import ProductCreate
+from core.product_import import iter_records, validate_record
+
+HEADER = "sku,name,description,price,quantity_in_stock,category,subcategory,reorder_point,reorder_quantity\n"
+
+
+def _records(text: str):
+    async def chunks():
+        yield text.encode()
+
+    async def collect():
+        return [record async for record in iter_records(chunks(), "csv")]
+
+    return asyncio.run(collect())
+
+
+def test_blank_optional_cells_are_not_given():
+    [(row, record)] = _records(HEADER + "TV-55,TV,d,100,3,tv,led,,\n")
+    product = validate_record(record)
+    assert row == 2
+    assert isinstance(product, ProductCreate)
+    assert product.reorder_point is None
+    assert product.reorder_quantity is None
+
+
+def test_blank_required_cell_still_fails():
+    [(_, record)] = _records(HEADER + "TV-55,TV,d,,3,tv,led,4,10\n")
+    assert "price" in validate_record(record)
+
+
+def test_unquoted_inch_mark_does_not_swallow_later_rows():
+    rows = _records(HEADER + 'TV-55,Samsung 55" 4K,d,100,3,tv,led,,\nTV-65,"TV, 65""",d,200,1,tv,led,2,\n')
+    assert [row for row, _ in rows] == [2, 3]
+    assert [record["name"] for _, record in rows] == ['Samsung 55" 4K', 'TV, 65"']